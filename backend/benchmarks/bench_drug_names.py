@@ -0,0 +1,93 @@
+"""Latency of DrugNameMatcher (fuzzy resolution and autocomplete) over a synthetic synonym list.
+
+    python benchmarks/bench_drug_names.py --names 50000
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.drug_names import DrugNameMatcher
+
+SYLLABLES = ["met", "for", "min", "am", "lo", "di", "pine", "ator", "va", "sta", "tin", "pra", "zol",
+             "ome", "cil", "lin", "amox", "ici", "cef", "tri", "ax", "one", "war", "far", "in", "clo"]
+
+
+def make_names(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+    return [(name, f"DB{i:05d}") for i, name in enumerate(sorted(names))]
+
+
+def corrupt(name: str, rng: random.Random) -> str:
+    # One OCR-style edit plus a dose suffix
+    i = rng.randrange(len(name))
+    edit = rng.choice(["drop", "swap", "replace"])
+    if edit == "drop":
+        name = name[:i] + name[i + 1:]
+    elif edit == "swap" and i < len(name) - 1:
+        name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    else:
+        name = name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    return f"{name.capitalize()} {rng.choice([250, 500, 850])}mg"
+
+
+def run(num_names: int = 50000, num_queries: int = 2000, verbose: bool = True) -> dict:
+    entries = make_names(num_names)
+    start = time.perf_counter()
+    matcher = DrugNameMatcher(entries)
+    build = time.perf_counter() - start
+    if verbose:
+        print(f"{len(matcher)} names indexed in {build:.2f}s")
+
+    rng = random.Random(9)
+    samples, hits = [], 0
+    for _ in range(num_queries):
+        name, drug_id = rng.choice(entries)
+        query = corrupt(name, rng)
+        start = time.perf_counter()
+        results = matcher.search(query, limit=5)
+        samples.append(time.perf_counter() - start)
+        hits += any(result[1] == drug_id for result in results)
+
+    samples.sort()
+    search = {"median_us": round(statistics.median(samples) * 1e6, 1), "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+              "top5_accuracy": round(hits / num_queries, 4)}
+    if verbose:
+        print(f"fuzzy search: median {search['median_us']:.0f}us, p99 {search['p99_us']:.0f}us, "
+              f"correct drug in top 5: {hits / num_queries:.1%}")
+
+    # Autocomplete is called per keystroke, so time every prefix length of a name
+    samples = []
+    for _ in range(num_queries // 10):
+        name, _ = rng.choice(entries)
+        for end in range(1, len(name) + 1):
+            start = time.perf_counter()
+            matcher.complete(name[:end], limit=10)
+            samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    complete = {"median_us": round(statistics.median(samples) * 1e6, 1), "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1)}
+    if verbose:
+        print(f"prefix complete: median {complete['median_us']:.0f}us, p99 {complete['p99_us']:.0f}us")
+    return {"names": len(matcher), "index_build_ms": round(build * 1000, 1), "search": search, "complete": complete}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    run(args.names, args.queries)
+
+
+if __name__ == "__main__":
+    main()
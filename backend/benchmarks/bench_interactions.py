@@ -0,0 +1,148 @@
+"""Compare the pandas scan used by InteractionService.check_interactions before the
+pair index with the indexed lookup, at 2, 10 and 50 requested drugs, and per-list
+checks with check_interactions_batch for bulk screening.
+
+Runs against synthetic datasets so it works without the real dataset/ folder:
+
+    python benchmarks/bench_interactions.py --drugs 5000 --interactions 50000,500000
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import statistics
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.interactions import InteractionService, InteractionIndex, screen_medication_lists
+from services.interaction_store import build_index_file, MappedInteractionIndex
+
+
+def make_dataset(num_drugs: int, num_interactions: int, seed: int = 7) -> pd.DataFrame:
+    rng = random.Random(seed)
+    ids = [f"DB{i:05d}" for i in range(num_drugs)]
+    rows = []
+    for _ in range(num_interactions):
+        a, b = rng.sample(ids, 2)
+        rows.append((a, f"{a} may increase the effect of {b}", b, None if rng.random() < 0.3 else "Nausea"))
+    return pd.DataFrame(rows, columns=["Drug1", "Interaction", "Drug2", "Adverse Effects"])
+
+
+def make_service(df: pd.DataFrame) -> InteractionService:
+    # Bypass the singleton so the benchmark never touches dataset/ on disk
+    service = object.__new__(InteractionService)
+    ids = pd.unique(pd.concat([df["Drug1"], df["Drug2"]]))
+    service._index = InteractionIndex.from_dataframe(df, {drug_id.lower(): drug_id for drug_id in ids})
+    return service
+
+
+def make_mapped_service(df: pd.DataFrame, workdir: str) -> InteractionService:
+    # Same dataset compiled to the memory-mapped format used in production
+    csv_path = os.path.join(workdir, "data_final_v5.csv")
+    synonyms_path = os.path.join(workdir, "drugs_synonyms.json")
+    index_path = os.path.join(workdir, "interactions.idx")
+    df.to_csv(csv_path, index=False)
+    ids = pd.unique(pd.concat([df["Drug1"], df["Drug2"]]))
+    with open(synonyms_path, "w", encoding="utf-8") as f:
+        json.dump({drug_id: [drug_id] for drug_id in ids}, f)
+    build_index_file(csv_path, synonyms_path, index_path)
+    service = object.__new__(InteractionService)
+    service._index = MappedInteractionIndex(index_path)
+    return service
+
+
+def legacy_check(service: InteractionService, df: pd.DataFrame, drug_names):
+    # The pre-index implementation: two isin masks over the whole frame plus iterrows()
+    drug_ids = {}
+    for name in drug_names:
+        drug_id = service.get_drug_id(name)
+        if drug_id:
+            drug_ids[drug_id] = name
+    if len(drug_ids) < 2:
+        return []
+    ids_to_check = list(drug_ids.keys())
+    results = df[df["Drug1"].isin(ids_to_check) & df["Drug2"].isin(ids_to_check)]
+    found = []
+    for _, row in results.iterrows():
+        if row["Drug1"] == row["Drug2"]:
+            continue
+        found.append({
+            "drug1": drug_ids.get(row["Drug1"], row["Drug1"]),
+            "drug2": drug_ids.get(row["Drug2"], row["Drug2"]),
+            "description": row["Interaction"],
+            "severity": "Moderate",
+            "adverse_effects": row["Adverse Effects"] if pd.notna(row["Adverse Effects"]) else "Not specified"
+        })
+    return found
+
+
+def time_call(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(num_drugs: int = 5000, interaction_sizes=(50000, 200000), repeat: int = 20, num_lists: int = 5000,
+        drug_counts=(2, 10, 50), verbose: bool = True) -> dict:
+    results = {"drugs": num_drugs, "datasets": []}
+    for num_interactions in interaction_sizes:
+        df = make_dataset(num_drugs, num_interactions)
+        start = time.perf_counter()
+        service = make_service(df)
+        build = time.perf_counter() - start
+        entry = {"interactions": len(service._index), "index_build_ms": round(build * 1000, 1), "checks": [], "bulk": []}
+        if verbose:
+            print(f"dataset: {num_drugs} drugs, {len(service._index)} interactions, index built in {build:.2f}s")
+
+        rng = random.Random(11)
+        all_ids = list(service._index._drug_ids)
+        if verbose:
+            print(f"{'drugs':>6} {'legacy ms':>11} {'indexed ms':>11} {'speedup':>9}")
+        for k in drug_counts:
+            names = rng.sample(all_ids, k)
+            assert sorted(map(str, legacy_check(service, df, names))) == sorted(map(str, service.check_interactions(names)))
+            legacy = time_call(lambda: legacy_check(service, df, names), repeat)
+            indexed = time_call(lambda: service.check_interactions(names), repeat)
+            entry["checks"].append({"drugs": k, "legacy_ms": round(legacy * 1000, 3), "indexed_ms": round(indexed * 1000, 3)})
+            if verbose:
+                print(f"{k:>6} {legacy * 1000:>11.3f} {indexed * 1000:>11.3f} {legacy / indexed:>8.0f}x")
+
+        # Bulk screening: lists of 3-15 drugs drawn from a pool, so names repeat across lists
+        pool = rng.sample(all_ids, min(len(all_ids), 2000))
+        lists = [rng.sample(pool, rng.randint(3, 15)) for _ in range(num_lists)]
+        with tempfile.TemporaryDirectory() as workdir:
+            for label, bulk_service in (("in-memory", service), ("mapped", make_mapped_service(df, workdir))):
+                start = time.perf_counter()
+                per_list = [bulk_service.check_interactions_detailed(names) for names in lists]
+                looped = time.perf_counter() - start
+                start = time.perf_counter()
+                batched = list(screen_medication_lists(bulk_service, lists))
+                vectorised = time.perf_counter() - start
+                assert [sorted(map(str, r["interactions"])) for r in per_list] == [sorted(map(str, r["interactions"])) for r in batched]
+                entry["bulk"].append({"index": label, "lists": num_lists, "per_list_ms": round(looped * 1000, 1), "batched_ms": round(vectorised * 1000, 1)})
+                if verbose:
+                    print(f"bulk screening of {num_lists} lists ({label}): per-list {looped * 1000:.0f} ms, batched {vectorised * 1000:.0f} ms")
+        results["datasets"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drugs", type=int, default=5000)
+    parser.add_argument("--interactions", default="50000,200000", help="comma-separated dataset sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--lists", type=int, default=5000, help="medication lists in the bulk screening run")
+    args = parser.parse_args()
+
+    run(args.drugs, [int(size) for size in args.interactions.split(",")], args.repeat, args.lists)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Latency of the list endpoints (GET /patients, /patients/{id}/documents and
+/api/records/{id}) against a throwaway database holding 10k, 100k and 1M rows.
+
+    python benchmarks/bench_list_endpoints.py --rows 10000,100000,1000000
+"""
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from common import isolated_backend, measure
+
+from fastapi.testclient import TestClient
+
+from db import get_db
+
+
+def populate(rows: int, patient_share: float = 0.01, seed: int = 13) -> str:
+    # rows patients and rows documents; one patient owns patient_share of the documents
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    target = "pat_bench_target"
+    owned = max(1, int(rows * patient_share))
+    with get_db() as conn:
+        conn.executemany(
+            "INSERT INTO patients (id, name, phone, created_at) VALUES (?, ?, ?, ?)",
+            ((target if i == 0 else f"pat_{i:012x}", f"Patient {i}", None, (base + timedelta(seconds=i)).isoformat())
+             for i in range(rows))
+        )
+        conn.executemany(
+            "INSERT INTO documents (id, patient_id, filename, mime_type, submitted_at, storage_path) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"doc_{i:012x}", target if i < owned else f"pat_{rng.randrange(1, rows):012x}", f"report_{i}.pdf",
+              "application/pdf", (base + timedelta(seconds=i)).isoformat(), f"/nonexistent/doc_{i}.pdf")
+             for i in range(rows))
+        )
+    return target
+
+
+def run(row_counts=(10000, 100000, 1000000), repeat: int = 5, verbose: bool = True) -> dict:
+    import main
+
+    results = {"sizes": []}
+    client = TestClient(main.app)
+    for rows in row_counts:
+        with isolated_backend():
+            start = time.perf_counter()
+            patient_id = populate(rows)
+            seed_seconds = time.perf_counter() - start
+
+            # Full 1M-row responses take seconds each, so repeat less at that size
+            times = max(1, repeat if rows <= 100000 else 1)
+            entry = {"rows": rows, "populate_s": round(seed_seconds, 2), "endpoints": {}}
+            for label, path in (("patients", "/patients"),
+                                ("documents", f"/patients/{patient_id}/documents"),
+                                ("records", f"/api/records/{patient_id}")):
+                response = client.get(path)
+                assert response.status_code == 200, response.text[:200]
+                entry["endpoints"][label] = {"response_bytes": len(response.content), **measure(lambda: client.get(path), times, warmup=0)}
+                if verbose:
+                    print(f"{rows:>8} rows  GET {path:<40} {entry['endpoints'][label]['median_ms']:>10.1f} ms "
+                          f"({len(response.content) / 1e6:.1f} MB)")
+            results["sizes"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="comma-separated table sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run([int(rows) for rows in args.rows.split(",")], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
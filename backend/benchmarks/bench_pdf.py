@@ -0,0 +1,74 @@
+"""PDF text extraction throughput for extract_text_from_pdf, called directly and through
+the process pool the summary/QA endpoints use.
+
+    python benchmarks/bench_pdf.py --pages 1,10,50 --documents 16
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from common import make_text_pdf, measure
+
+from services.gemini import extract_text_from_pdf
+from services.executor import run_in_process, shutdown_executors, CPU_PROCESS_WORKERS
+
+
+async def _extract_all(paths):
+    return await asyncio.gather(*(run_in_process(extract_text_from_pdf, path) for path in paths))
+
+
+def run(page_counts=(1, 10, 50), documents: int = 16, repeat: int = 5, verbose: bool = True) -> dict:
+    results = {"process_workers": CPU_PROCESS_WORKERS, "sizes": []}
+    with tempfile.TemporaryDirectory(prefix="arogya_bench_pdf_") as workdir:
+        for pages in page_counts:
+            content = make_text_pdf(pages)
+            paths = []
+            for i in range(documents):
+                path = os.path.join(workdir, f"doc_{pages}_{i}.pdf")
+                with open(path, "wb") as f:
+                    f.write(content)
+                paths.append(path)
+
+            assert "metformin" in extract_text_from_pdf(paths[0]) or pages < 2
+            single = measure(lambda: extract_text_from_pdf(paths[0]), repeat)
+
+            # Several documents at once through the pool, as when a patient has many PDFs
+            asyncio.run(_extract_all(paths[:1]))
+            start = time.perf_counter()
+            for _ in range(repeat):
+                asyncio.run(_extract_all(paths))
+            pooled = (time.perf_counter() - start) / repeat
+
+            entry = {
+                "pages": pages,
+                "bytes": len(content),
+                "single": single,
+                "single_pages_per_s": round(pages / (single["median_ms"] / 1000), 1),
+                "single_mb_per_s": round(len(content) / 1e6 / (single["median_ms"] / 1000), 2),
+                "pooled_documents": documents,
+                "pooled_ms": round(pooled * 1000, 3),
+                "pooled_pages_per_s": round(pages * documents / pooled, 1),
+            }
+            results["sizes"].append(entry)
+            if verbose:
+                print(f"{pages:>3} pages ({len(content) / 1024:.0f} KiB): {single['median_ms']:.2f} ms each, "
+                      f"{entry['single_pages_per_s']:.0f} pages/s; {documents} through the pool in {pooled * 1000:.0f} ms "
+                      f"({entry['pooled_pages_per_s']:.0f} pages/s)")
+    shutdown_executors()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1,10,50", help="comma-separated page counts")
+    parser.add_argument("--documents", type=int, default=16, help="documents extracted concurrently through the pool")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run([int(p) for p in args.pages.split(",")], args.documents, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Cold start of the backend: `import main` time with a per-module breakdown from
+`python -X importtime`, and time from launching uvicorn to the first 200 from /health.
+Every run is a fresh interpreter against a throwaway database, storage and dataset dir.
+
+    python benchmarks/bench_startup.py --repeat 5 --top 15
+"""
+import os
+import re
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+from collections import defaultdict
+
+from common import BACKEND_DIR, summarize
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _startup_env(workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(workdir, "startup.db"),
+        "STORAGE_DIR": os.path.join(workdir, "storage"),
+        "DATASET_DIR": os.path.join(workdir, "dataset"),
+        # A key makes the Gemini SDK part of the startup path, as in production
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY") or "benchmark",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def import_profile(env: dict) -> dict:
+    # module -> cumulative microseconds, for `main` and the modules it imports directly
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            env=env, capture_output=True, text=True, timeout=120).stderr
+    children = {}
+    for self_us, cumulative_us, indent, name in _IMPORTTIME_LINE.findall(output):
+        # Nesting is two spaces per level after one separating space; a module is
+        # listed after everything it imported.
+        if len(indent) == 3:
+            children[name] = int(cumulative_us)
+        elif len(indent) == 1:
+            if name == "main":
+                return {**children, "main": int(cumulative_us)}
+            children = {}
+    raise RuntimeError(f"import main failed:\n{output[-2000:]}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_health(env: dict, timeout: float = 60) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {server.returncode} before serving /health")
+                time.sleep(0.005)
+        raise RuntimeError(f"/health did not answer within {timeout} s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def run(repeat: int = 5, top: int = 15, verbose: bool = True) -> dict:
+    samples = defaultdict(list)
+    health = []
+    with tempfile.TemporaryDirectory(prefix="arogya_bench_startup_") as workdir:
+        os.makedirs(os.path.join(workdir, "dataset"))
+        env = _startup_env(workdir)
+        for _ in range(repeat):
+            for name, cumulative_us in import_profile(env).items():
+                samples[name].append(cumulative_us)
+            health.append(time_to_first_health(env))
+
+    modules = sorted(((name, statistics.median(values) / 1000) for name, values in samples.items() if name != "main"),
+                     key=lambda item: -item[1])
+    results = {
+        "import_main_ms": round(statistics.median(samples["main"]) / 1000, 3),
+        "first_health": summarize(health),
+        "slowest_imports_ms": {name: round(ms, 3) for name, ms in modules[:top]},
+    }
+    if verbose:
+        print(f"import main        {results['import_main_ms']:>8.1f} ms (median of {repeat})")
+        print(f"first /health 200  {results['first_health']['median_ms']:>8.1f} ms after launching uvicorn")
+        for name, ms in results["slowest_imports_ms"].items():
+            print(f"  {name:<40} {ms:>8.1f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="slowest direct imports of main to report")
+    args = parser.parse_args()
+
+    run(args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    main()
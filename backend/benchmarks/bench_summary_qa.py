@@ -0,0 +1,55 @@
+"""End-to-end latency of POST /patients/{id}/summary and /qa with Gemini replaced by
+a stub that sleeps for a fixed latency, so the rest of the path (SQLite, PDF reads and
+extraction, prompt building, response handling) is measured offline.
+
+    python benchmarks/bench_summary_qa.py --documents 1,5,20 --model-latency-ms 50
+"""
+import argparse
+
+from common import isolated_backend, make_text_pdf, measure, stub_gemini
+
+from fastapi.testclient import TestClient
+
+
+def run(document_counts=(1, 5, 20), pages: int = 5, model_latency_ms: float = 50, repeat: int = 5, verbose: bool = True) -> dict:
+    import main
+
+    results = {"model_latency_ms": model_latency_ms, "pages_per_document": pages, "sizes": []}
+    pdf = make_text_pdf(pages)
+    client = TestClient(main.app)
+    with stub_gemini(model_latency_ms / 1000):
+        for count in document_counts:
+            with isolated_backend():
+                patient_id = client.post("/patients", json={"name": "Summary Bench"}).json()["id"]
+                for i in range(count):
+                    client.post(f"/patients/{patient_id}/documents", files={"file": (f"report_{i}.pdf", pdf, "application/pdf")})
+
+                entry = {"documents": count, "endpoints": {}}
+                for label, path, body in (
+                        ("summary", f"/patients/{patient_id}/summary", None),
+                        ("qa", f"/patients/{patient_id}/qa", {"question": "Which medications are mentioned?"})):
+                    response = client.post(path, json=body)
+                    assert response.status_code == 200, response.text[:200]
+                    stats = measure(lambda: client.post(path, json=body), repeat, warmup=0)
+                    stats["overhead_ms"] = round(stats["median_ms"] - model_latency_ms, 3)
+                    entry["endpoints"][label] = stats
+                    if verbose:
+                        print(f"{count:>3} documents  POST {label:<8} {stats['median_ms']:>8.1f} ms "
+                              f"({stats['overhead_ms']:.1f} ms besides the model)")
+                results["sizes"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", default="1,5,20", help="comma-separated document counts per patient")
+    parser.add_argument("--pages", type=int, default=5, help="pages per generated PDF")
+    parser.add_argument("--model-latency-ms", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run([int(c) for c in args.documents.split(",")], args.pages, args.model_latency_ms, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
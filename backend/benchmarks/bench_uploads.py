@@ -0,0 +1,51 @@
+"""Upload throughput of POST /patients/{id}/documents and /patients/{id}/images at
+several payload sizes, against a throwaway database and storage directory.
+
+    python benchmarks/bench_uploads.py --sizes-kb 100,1024,10240
+"""
+import os
+import argparse
+
+from common import isolated_backend, make_text_pdf, measure
+
+from fastapi.testclient import TestClient
+
+
+def run(sizes_kb=(100, 1024, 10240), repeat: int = 10, verbose: bool = True) -> dict:
+    import main
+
+    results = {"sizes": []}
+    client = TestClient(main.app)
+    with isolated_backend():
+        patient_id = client.post("/patients", json={"name": "Upload Bench"}).json()["id"]
+        pdf = make_text_pdf(1)
+        for size_kb in sizes_kb:
+            # A valid PDF header padded to size; only the bytes moved matter here
+            document = pdf + os.urandom(max(0, size_kb * 1024 - len(pdf)))
+            image = b"\xff\xd8\xff\xe0" + os.urandom(size_kb * 1024 - 4)
+            entry = {"kb": size_kb, "endpoints": {}}
+            for label, path, payload, mime in (
+                    ("documents", f"/patients/{patient_id}/documents", document, "application/pdf"),
+                    ("images", f"/patients/{patient_id}/images", image, "image/jpeg")):
+                send = lambda: client.post(path, files={"file": (f"bench.{mime.split('/')[1]}", payload, mime)})
+                assert send().status_code == 201
+                stats = measure(send, repeat, warmup=0)
+                stats["mb_per_s"] = round(len(payload) / 1e6 / (stats["median_ms"] / 1000), 2)
+                entry["endpoints"][label] = stats
+                if verbose:
+                    print(f"{size_kb:>6} KiB  POST {label:<10} {stats['median_ms']:>8.1f} ms  {stats['mb_per_s']:>7.1f} MB/s")
+            results["sizes"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", default="100,1024,10240", help="comma-separated payload sizes in KiB")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    run([int(size) for size in args.sizes_kb.split(",")], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
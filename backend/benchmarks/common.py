@@ -0,0 +1,154 @@
+"""Shared helpers for the benchmark scripts: timing summaries, a throwaway database and
+storage directory, a minimal PDF writer and stub Gemini models."""
+import os
+import sys
+import time
+import random
+import platform
+import tempfile
+import statistics
+import subprocess
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORDS = ["patient", "reports", "mild", "chest", "pain", "blood", "pressure", "glucose", "level", "normal",
+         "history", "of", "hypertension", "prescribed", "metformin", "twice", "daily", "follow", "up", "in",
+         "two", "weeks", "no", "known", "allergies", "x-ray", "shows", "clear", "lungs", "fasting", "lipid",
+         "panel", "elevated", "ldl", "advised", "diet", "and", "exercise", "hemoglobin", "a1c", "within", "range"]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    # Seconds in, milliseconds out
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {
+        "n": len(ordered),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def environment_info() -> Dict[str, Optional[str]]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+@contextmanager
+def isolated_backend():
+    # Points db.py and services/files.py at a temporary database and storage tree, so
+    # benchmarks never touch backend/arogya.db or backend/storage.
+    import db
+    from services import files
+
+    saved = (db.DB_PATH, files.DOCUMENTS_DIR, files.IMAGES_DIR, files.TEMP_DIR)
+    with tempfile.TemporaryDirectory(prefix="arogya_bench_") as workdir:
+        db.DB_PATH = os.path.join(workdir, "bench.db")
+        files.DOCUMENTS_DIR = os.path.join(workdir, "documents")
+        files.IMAGES_DIR = os.path.join(workdir, "images")
+        files.TEMP_DIR = os.path.join(workdir, "tmp")
+        os.makedirs(files.DOCUMENTS_DIR)
+        os.makedirs(files.IMAGES_DIR)
+        os.makedirs(files.TEMP_DIR)
+        db.init_db()
+        try:
+            yield workdir
+        finally:
+            db.DB_PATH, files.DOCUMENTS_DIR, files.IMAGES_DIR, files.TEMP_DIR = saved
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(pages: int, lines_per_page: int = 40, seed: int = 3) -> bytes:
+    # Plain PDF 1.4 with Helvetica text on every page, written by hand so no PDF
+    # library is needed to produce fixtures. PyPDF2 extracts the text back out.
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))) for _ in range(lines_per_page)]
+        body = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % content_ref)
+        page_refs.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % ref for ref in page_refs), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    # Stands in for genai.GenerativeModel: sleeps for the configured latency and returns
+    # text shaped like the real summary / QA answers.
+    latency_seconds = 0.05
+
+    def __init__(self, model_name: str = "stub", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency_seconds)
+        prompt = contents if isinstance(contents, str) else " ".join(str(part) for part in contents)
+        if "bullet points" in prompt:
+            return _StubResponse("\n".join(f"- Finding {i} from the submitted records." for i in range(1, 6)))
+        return _StubResponse("Answer: The records mention metformin twice daily.\nSources: report_0.pdf")
+
+
+@contextmanager
+def stub_gemini(latency_seconds: float):
+    # Makes services.gemini call StubGenerativeModel instead of the Google SDK
+    from services import gemini
+
+    genai = gemini.load_genai()
+    saved = (gemini.GEMINI_API_KEY, genai.GenerativeModel, genai.configure, StubGenerativeModel.latency_seconds)
+    gemini.GEMINI_API_KEY = "benchmark"
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure = lambda **kwargs: None
+    StubGenerativeModel.latency_seconds = latency_seconds
+    try:
+        yield
+    finally:
+        gemini.GEMINI_API_KEY, genai.GenerativeModel, genai.configure, StubGenerativeModel.latency_seconds = saved
@@ -0,0 +1,135 @@
+"""Run the backend benchmark suite and write the results as JSON.
+
+Everything runs offline: synthetic interaction datasets, generated PDFs, a throwaway
+SQLite database and a stub Gemini model. Compare two runs (e.g. before and after a
+change) with --compare:
+
+    python benchmarks/run_all.py --output results/$(git rev-parse --short HEAD).json
+    python benchmarks/run_all.py --quick --compare results/abc1234.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+from common import environment_info
+
+import bench_drug_names
+import bench_interactions
+import bench_list_endpoints
+import bench_pdf
+import bench_startup
+import bench_summary_qa
+import bench_uploads
+
+# name -> (full run, --quick run)
+SUITES = {
+    "interactions": (
+        lambda: bench_interactions.run(5000, (50000, 200000, 1000000), repeat=20, num_lists=5000, verbose=False),
+        lambda: bench_interactions.run(2000, (20000,), repeat=5, num_lists=500, verbose=False),
+    ),
+    "drug_names": (
+        lambda: bench_drug_names.run(50000, 2000, verbose=False),
+        lambda: bench_drug_names.run(5000, 300, verbose=False),
+    ),
+    "pdf_extraction": (
+        lambda: bench_pdf.run((1, 10, 50), documents=16, repeat=5, verbose=False),
+        lambda: bench_pdf.run((1, 10), documents=4, repeat=3, verbose=False),
+    ),
+    "list_endpoints": (
+        lambda: bench_list_endpoints.run((10000, 100000, 1000000), repeat=5, verbose=False),
+        lambda: bench_list_endpoints.run((10000,), repeat=3, verbose=False),
+    ),
+    "uploads": (
+        lambda: bench_uploads.run((100, 1024, 10240), repeat=10, verbose=False),
+        lambda: bench_uploads.run((100, 1024), repeat=3, verbose=False),
+    ),
+    "summary_qa": (
+        lambda: bench_summary_qa.run((1, 5, 20), pages=5, model_latency_ms=50, repeat=5, verbose=False),
+        lambda: bench_summary_qa.run((1, 5), pages=2, model_latency_ms=50, repeat=3, verbose=False),
+    ),
+    "startup": (
+        lambda: bench_startup.run(repeat=7, verbose=False),
+        lambda: bench_startup.run(repeat=3, verbose=False),
+    ),
+}
+
+# Metrics compared by --compare; lower is better for all of them
+_COMPARED_KEYS = ("median_ms", "p95_ms", "indexed_ms", "per_list_ms", "batched_ms", "pooled_ms", "median_us", "overhead_ms", "import_main_ms")
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _flatten(item, f"{prefix}[{i}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(previous: dict, current: dict, threshold: float) -> list:
+    old = dict(_flatten(previous.get("results", {})))
+    changes = []
+    for path, value in _flatten(current.get("results", {})):
+        if path.rsplit(".", 1)[-1] not in _COMPARED_KEYS or path not in old or not old[path]:
+            continue
+        ratio = value / old[path]
+        if abs(ratio - 1) >= threshold:
+            changes.append((path, old[path], value, ratio))
+    return sorted(changes, key=lambda change: -abs(change[3] - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast smoke run")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported by --compare")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SUITES)
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "quick": args.quick,
+        "environment": environment_info(),
+        "results": {},
+        "durations_s": {},
+    }
+    for name in names:
+        print(f"running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        report["results"][name] = SUITES[name][1 if args.quick else 0]()
+        report["durations_s"][name] = round(time.perf_counter() - start, 2)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        changes = compare(previous, report, args.threshold)
+        print(f"\nchanges of {args.threshold:.0%} or more against {args.compare} "
+              f"({previous.get('environment', {}).get('commit')}):", file=sys.stderr)
+        for path, old, new, ratio in changes:
+            print(f"  {path:<70} {old:>12.3f} -> {new:>12.3f}  ({ratio - 1:+.0%})", file=sys.stderr)
+        if not changes:
+            print("  none", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,78 @@
 import sqlite3
 import os
+import time
 from contextlib import contextmanager
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "arogya.db")
+from services.metrics import SQLITE_QUERY_SECONDS, DB_CONNECTION_SECONDS
+from services.tracing import span
+
+# DB_PATH points the app at another database, e.g. one filled by scripts/generate_synthetic_data.py
+DB_PATH = os.getenv("DB_PATH") or os.path.join(os.path.dirname(__file__), "arogya.db")
+
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def _statement_kind(sql: str) -> str:
+    kind = sql.lstrip()[:6].upper()
+    return kind if kind in _STATEMENT_KINDS else "OTHER"
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Records execute() time per statement kind. SELECT rows are stepped lazily, so for
+    # large reads the fetch time lands in the connection histogram instead.
+    def execute(self, sql, parameters=()):
+        self.connection.statements += 1
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            SQLITE_QUERY_SECONDS.labels(_statement_kind(sql)).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.statements += 1
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            SQLITE_QUERY_SECONDS.labels(_statement_kind(sql)).observe(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = 0
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
 @contextmanager
 def get_db():
-    conn = get_connection()
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    # Only traced inside a request or job span; the job poller and watchers call this every tick
+    with span("sqlite.connection", "CLIENT", child_only=True, **{"db.system": "sqlite"}) as db_span:
+        start = time.perf_counter()
+        conn = get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+            DB_CONNECTION_SECONDS.observe(time.perf_counter() - start)
+            db_span.set_attribute("db.statements", conn.statements)
 
 def init_db():
     with get_db() as conn:
@@ -98,5 +151,84 @@ def init_db():
                 created_at TEXT NOT NULL
             )
         """)
-        
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_used_at TEXT NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache (namespace, last_used_at)")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                patient_id TEXT NOT NULL,
+                image_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                refresh INTEGER NOT NULL DEFAULT 0,
+                result TEXT NULL,
+                error TEXT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                next_run_at TEXT NOT NULL,
+                claimed_by TEXT NULL,
+                lease_expires TEXT NULL,
+                FOREIGN KEY (image_id) REFERENCES images (id)
+            )
+        """)
+
+        # Databases created before job leases existed
+        cursor.execute("PRAGMA table_info(analysis_jobs)")
+        job_columns = {row["name"] for row in cursor.fetchall()}
+        for column in ("claimed_by", "lease_expires"):
+            if column not in job_columns:
+                cursor.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} TEXT NULL")
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_queue ON analysis_jobs (status, next_run_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_patient ON analysis_jobs (patient_id, created_at)")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS patient_medications (
+                id TEXT PRIMARY KEY,
+                patient_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                dosage TEXT NOT NULL,
+                frequency TEXT NOT NULL,
+                drug_key TEXT NOT NULL,
+                drug_id TEXT NULL,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                added_at TEXT NOT NULL,
+                stopped_at TEXT NULL,
+                FOREIGN KEY (patient_id) REFERENCES patients (id)
+            )
+        """)
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_patient_medications_active ON patient_medications (patient_id, status, drug_key)")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS patient_interaction_pairs (
+                patient_id TEXT NOT NULL,
+                drug_a TEXT NOT NULL,
+                drug_b TEXT NOT NULL,
+                dataset_version TEXT NOT NULL,
+                interactions_json TEXT NOT NULL,
+                checked_at TEXT NOT NULL,
+                PRIMARY KEY (patient_id, drug_a, drug_b),
+                FOREIGN KEY (patient_id) REFERENCES patients (id)
+            )
+        """)
+
         conn.commit()
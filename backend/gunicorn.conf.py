@@ -0,0 +1,22 @@
+import gc
+import os
+
+# Multi-process deployment: gunicorn -c gunicorn.conf.py main:app
+# (pip install gunicorn; uvicorn provides the worker class)
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork workers from it. The mapped interaction
+# index is then shared through the page cache, and everything else the master loaded
+# is shared copy-on-write until a worker writes to it.
+preload_app = True
+
+
+def when_ready(server):
+    from services.interactions import start_warmup
+
+    start_warmup().result()
+    # Move everything loaded so far out of the GC's generations; otherwise the first
+    # collection in each worker touches every object and un-shares their pages.
+    gc.freeze()
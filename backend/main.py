@@ -1,5 +1,6 @@
 import os
 import sys
+import hmac
 import uuid
 import json
 import asyncio
@@ -7,9 +8,9 @@ import random
 from datetime import datetime, timezone
 from typing import Optional, List
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Form, Header, Depends, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from dotenv import load_dotenv
@@ -25,29 +26,77 @@ from db import init_db, get_db
 from schemas import (
     PatientCreate, Patient, PatientList,
     Document, DocumentList,
-    Image, ImageList, ImageAnalysis,
+    Image, ImageList, ImageAnalysis, AnalysisJob, AnalysisJobList,
     SummaryResponse, QARequest, QAResponse, Citation,
     InteractionCheckRequest, InteractionCheckResponse, InteractionMatch,
+    InteractionBatchRequest, DrugSuggestResponse,
+    MedicationAddRequest, MedicationProfile,
     HealthResponse, ErrorResponse, ErrorDetail,
     UserCreate, UserLogin, AuthResponse
 )
-from services.files import save_document, save_image, get_document_path, get_image_path, DOCUMENTS_DIR, IMAGES_DIR
+from services.files import (
+    save_document, save_image, get_document_path, get_image_path, spool_upload, spooled_path, sweep_temp_scans, sweep_preprocessed_cache,
+    DOCUMENTS_DIR, IMAGES_DIR, TEMP_DIR
+)
 from services.audit import log_event
 from services.gemini import generate_summary, grounded_qa, extract_text_from_pdf
-from services.medgemma import analyze_medical_image
-# from services.interactions import check_interactions
-import bcrypt
+from services.medgemma import analyze_medical_image_buffer
+from services.image_analysis import get_cached_image_analysis, save_image_analysis, analyze_images_batch
+from services.jobs import create_job, get_job, list_jobs, start_workers, stop_workers
+from services.result_cache import get_cached, put_cached, hash_bytes
+from services.auth_tokens import AuthMiddleware, issue_token, revoke_token
+from services.metrics import MetricsMiddleware, model_call, render_metrics
+from services.profiling import ProfilingMiddleware, list_request_profiles, get_request_profile, get_request_pstats, clear_request_profiles
+from services.tracing import TracingMiddleware, recent_traces, get_trace
+from services.executor import run_in_thread, run_in_process, executor_stats, shutdown_executors, ExecutorUnavailableError
+from services.warmup import start_import_warmup
+from services.preprocess import encode_image_bytes, encode_image_file
+from services.medication_profile import add_medications, stop_medication, get_profile
+from services.interactions import (
+    start_warmup, get_interaction_service, interaction_service_status, BATCH_SCREEN_CHUNK_SIZE,
+    reload_interaction_service, start_dataset_watcher, stop_dataset_watcher,
+    InteractionReloadError, ReloadInProgressError, InteractionServiceUnavailableError, INTERACTIONS_RETRY_SECONDS
+)
 
 def verify_password(plain_password, hashed_password):
+    import bcrypt
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password):
+    import bcrypt
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 app = FastAPI(title="Arogya AI API", version="1.0.0")
 
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5000,http://127.0.0.1:5000").split(",")
 
+# Shared secret for /admin endpoints; admin routes are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+# When true, every route outside PUBLIC_PATHS needs a valid bearer token
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() == "true"
+PUBLIC_PATHS = {"/health", "/metrics", "/api/auth/login", "/api/auth/register", "/docs", "/redoc", "/openapi.json"}
+
+# Added first, so it runs innermost: profiling, metrics and tracing still see rejected requests
+app.add_middleware(AuthMiddleware, required=AUTH_REQUIRED, public_paths=PUBLIC_PATHS)
+
+def current_user(request: Request) -> dict:
+    if request.state.auth is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return request.state.auth
+
+app.add_middleware(ProfilingMiddleware, admin_token=ADMIN_TOKEN)
+
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS + ["*"],
@@ -61,6 +110,25 @@ async def startup():
     init_db()
     os.makedirs(DOCUMENTS_DIR, exist_ok=True)
     os.makedirs(IMAGES_DIR, exist_ok=True)
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    removed = sweep_temp_scans()
+    if removed:
+        print(f"Removed {removed} leftover temp scan files.")
+    evicted = sweep_preprocessed_cache()
+    if evicted:
+        print(f"Evicted {evicted} preprocessed images from the cache.")
+    start_workers()
+    # Drug interaction data loads in the background; /health reports when it is ready
+    start_warmup()
+    start_dataset_watcher()
+    # SDKs such as google.generativeai are imported lazily; preload them off the event loop
+    start_import_warmup()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_dataset_watcher()
+    await stop_workers()
+    shutdown_executors()
 
 def make_error(code: str, message: str, details: dict = None):
     return JSONResponse(
@@ -68,9 +136,32 @@ def make_error(code: str, message: str, details: dict = None):
         content={"error": {"code": code, "message": message, "details": details or {}}}
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health", response_model=HealthResponse)
 async def health():
-    return {"status": "ok"}
+    interactions = interaction_service_status()
+    dataset_version = (await get_interaction_service()).dataset_version if interactions == "ready" else None
+    return {"status": "ok", "ready": interactions == "ready", "interactions": interactions, "dataset_version": dataset_version}
+
+@app.exception_handler(ExecutorUnavailableError)
+async def executor_unavailable(request: Request, exc: ExecutorUnavailableError):
+    # A crashed or stuck worker process; the pool has been replaced, so a retry can succeed
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+async def interaction_service_or_503():
+    try:
+        return await get_interaction_service()
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Drug interaction data is still loading. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    except InteractionServiceUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, int(INTERACTIONS_RETRY_SECONDS)))})
 
 @app.post("/api/auth/register", response_model=AuthResponse)
 async def register(user: UserCreate):
@@ -84,7 +175,7 @@ async def register(user: UserCreate):
             raise HTTPException(status_code=400, detail="Username already registered")
         
         user_id = str(uuid.uuid4())
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await run_in_thread(get_password_hash, user.password)
         created_at = datetime.now(timezone.utc).isoformat()
         
         patient_id = None
@@ -102,7 +193,7 @@ async def register(user: UserCreate):
         )
         
         return AuthResponse(
-            token="dummy-token", # In a real app, generate JWT here
+            token=issue_token(user_id, user.role, patient_id),
             user_id=user_id,
             username=user.username,
             role=user.role,
@@ -117,14 +208,14 @@ async def login(user: UserLogin):
 
         row = cursor.fetchone()
         
-        if not row or not verify_password(user.password, row["password_hash"]):
+        if not row or not await run_in_thread(verify_password, user.password, row["password_hash"]):
             raise HTTPException(status_code=401, detail="Incorrect username or password")
             
         if user.role and user.role != row["role"]:
             raise HTTPException(status_code=403, detail=f"Access denied. This account is for {row['role']}s only.")
 
         return AuthResponse(
-            token="dummy-token",
+            token=issue_token(row["id"], row["role"], row["patient_id"]),
             user_id=row["id"],
             username=row["username"],
             role=row["role"],
@@ -132,6 +223,16 @@ async def login(user: UserLogin):
         )
 
 
+@app.get("/api/auth/me")
+async def auth_me(claims: dict = Depends(current_user)):
+    return {"user_id": claims["sub"], "role": claims["role"], "patient_id": claims.get("patient_id"), "expires_at": claims["exp"]}
+
+@app.post("/api/auth/logout", status_code=204)
+async def logout(claims: dict = Depends(current_user)):
+    revoke_token(claims)
+    log_event("USER_LOGGED_OUT", claims.get("patient_id"), {"user_id": claims["sub"]})
+    return Response(status_code=204)
+
 @app.post("/patients", response_model=Patient, status_code=201)
 async def create_patient(patient: PatientCreate):
     patient_id = f"pat_{uuid.uuid4().hex[:12]}"
@@ -288,33 +389,139 @@ async def list_images(patient_id: str):
     
     return ImageList(items=items)
 
-@app.post("/patients/{patient_id}/images/{image_id}/analyze", response_model=ImageAnalysis)
-async def analyze_image(patient_id: str, image_id: str):
+@app.post("/patients/{patient_id}/images/{image_id}/analyze", response_model=AnalysisJob, status_code=202)
+async def analyze_image(patient_id: str, image_id: str, refresh: bool = Query(False)):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT storage_path FROM images WHERE id = ? AND patient_id = ?", (image_id, patient_id))
         row = cursor.fetchone()
-    
+
     if not row:
         raise HTTPException(status_code=404, detail="Image not found")
-    
-    storage_path = row["storage_path"]
-    
-    result = await analyze_medical_image(storage_path)
-    
-    analysis_id = f"ana_{uuid.uuid4().hex[:12]}"
-    created_at = datetime.now(timezone.utc).isoformat()
-    
+
+    # A cached result completes the job immediately; otherwise a worker picks it up.
+    # refresh=true bypasses the content-hash cache and forces a new model run.
+    try:
+        cached = None if refresh else await get_cached_image_analysis(row["storage_path"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file not found")
+
+    if cached is not None:
+        with get_db() as conn:
+            save_image_analysis(conn.cursor(), image_id, cached)
+        job = create_job(patient_id, image_id, result=cached)
+        log_event("IMAGE_ANALYZED", patient_id, {"image_id": image_id, "job_id": job["id"], "cached": True})
+    else:
+        job = create_job(patient_id, image_id, refresh=refresh)
+        log_event("IMAGE_ANALYSIS_QUEUED", patient_id, {"image_id": image_id, "job_id": job["id"]})
+
+    return AnalysisJob(**job)
+
+@app.post("/patients/{patient_id}/images/analyze-batch")
+async def analyze_images_batch_endpoint(patient_id: str):
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO image_analysis (id, image_id, result, created_at) VALUES (?, ?, ?, ?)",
-            (analysis_id, image_id, result, created_at)
-        )
-    
-    log_event("IMAGE_ANALYZED", patient_id, {"image_id": image_id})
-    
-    return ImageAnalysis(result=result, created_at=created_at)
+        cursor.execute("SELECT id FROM patients WHERE id = ?", (patient_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Patient not found")
+
+        cursor.execute("""
+            SELECT i.id, i.storage_path
+            FROM images i
+            LEFT JOIN image_analysis ia ON i.id = ia.image_id
+            WHERE i.patient_id = ? AND ia.id IS NULL
+            ORDER BY i.submitted_at
+        """, (patient_id,))
+        images = [dict(row) for row in cursor.fetchall()]
+
+    async def progress():
+        total = len(images)
+        completed = []
+        done = 0
+
+        yield json.dumps({"event": "started", "total": total}) + "\n"
+
+        async for image, result, cached, error in analyze_images_batch(images):
+            done += 1
+            if result is not None:
+                completed.append((image["id"], result))
+            yield json.dumps({
+                "event": "image",
+                "image_id": image["id"],
+                "status": "succeeded" if result is not None else "failed",
+                "cached": cached,
+                "error": error,
+                "done": done,
+                "total": total
+            }) + "\n"
+
+        # All results land in a single transaction once every image has finished.
+        with get_db() as conn:
+            cursor = conn.cursor()
+            for image_id, result in completed:
+                save_image_analysis(cursor, image_id, result)
+
+        log_event("IMAGES_BATCH_ANALYZED", patient_id, {"total": total, "succeeded": len(completed)})
+
+        yield json.dumps({"event": "committed", "succeeded": len(completed), "failed": total - len(completed)}) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+@app.get("/patients/{patient_id}/analysis-jobs", response_model=AnalysisJobList)
+async def list_analysis_jobs(patient_id: str, status: Optional[str] = Query(None)):
+    return AnalysisJobList(items=[AnalysisJob(**job) for job in list_jobs(patient_id, status)])
+
+@app.get("/patients/{patient_id}/analysis-jobs/{job_id}", response_model=AnalysisJob)
+async def get_analysis_job(patient_id: str, job_id: str):
+    job = get_job(job_id, patient_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return AnalysisJob(**job)
+
+def ensure_patient(patient_id: str):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM patients WHERE id = ?", (patient_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Patient not found")
+
+def medication_profile_response(profile: dict) -> MedicationProfile:
+    overall, _ = interaction_overall(profile["interactions"], profile["unresolved"])
+    return MedicationProfile(
+        patient_id=profile["patient_id"],
+        medications=profile["medications"],
+        overall=overall,
+        matches=[interaction_match(m) for m in profile["interactions"]],
+        unresolved=profile["unresolved"],
+        dataset_version=profile["dataset_version"],
+        evaluated_pairs=profile["evaluated_pairs"]
+    )
+
+@app.get("/patients/{patient_id}/medications", response_model=MedicationProfile)
+async def get_medication_profile(patient_id: str):
+    ensure_patient(patient_id)
+    interaction_service = await interaction_service_or_503()
+    return medication_profile_response(get_profile(interaction_service, patient_id))
+
+@app.post("/patients/{patient_id}/medications", response_model=MedicationProfile)
+async def add_patient_medications(patient_id: str, request: MedicationAddRequest):
+    ensure_patient(patient_id)
+    interaction_service = await interaction_service_or_503()
+    added = add_medications(interaction_service, patient_id, [m.model_dump() for m in request.medications], "manual")
+    profile = get_profile(interaction_service, patient_id)
+    log_event("MEDICATIONS_ADDED", patient_id, {"added": len(added), "evaluated_pairs": profile["evaluated_pairs"]})
+    return medication_profile_response(profile)
+
+@app.delete("/patients/{patient_id}/medications/{medication_id}", response_model=MedicationProfile)
+async def stop_patient_medication(patient_id: str, medication_id: str):
+    ensure_patient(patient_id)
+    interaction_service = await interaction_service_or_503()
+    if not stop_medication(patient_id, medication_id):
+        raise HTTPException(status_code=404, detail="Active medication not found")
+    log_event("MEDICATION_STOPPED", patient_id, {"medication_id": medication_id})
+    return medication_profile_response(get_profile(interaction_service, patient_id))
 
 @app.post("/patients/{patient_id}/summary", response_model=SummaryResponse)
 async def create_summary(patient_id: str):
@@ -333,7 +540,7 @@ async def create_summary(patient_id: str):
     documents_text = []
     for doc in docs:
         if doc["storage_path"].endswith(".pdf"):
-            text = extract_text_from_pdf(doc["storage_path"])
+            text = await run_in_process(extract_text_from_pdf, doc["storage_path"])
         else:
             try:
                 with open(doc["storage_path"], "r") as f:
@@ -375,7 +582,7 @@ async def patient_qa(patient_id: str, request: QARequest):
     documents_text = []
     for doc in docs:
         if doc["storage_path"].endswith(".pdf"):
-            text = extract_text_from_pdf(doc["storage_path"])
+            text = await run_in_process(extract_text_from_pdf, doc["storage_path"])
         else:
             try:
                 with open(doc["storage_path"], "r") as f:
@@ -392,31 +599,183 @@ async def patient_qa(patient_id: str, request: QARequest):
     
     return QAResponse(answer=answer, citations=citations)
 
+# Upper bound on medication lists per /safety/interactions/check-batch request
+BATCH_SCREEN_MAX_LISTS = int(os.getenv("BATCH_SCREEN_MAX_LISTS", "20000"))
+
+def interaction_overall(matches: list, unresolved: list):
+    # Names we could not match are not evidence of safety
+    if matches:
+        return "warning", "Interactions found in database."
+    if unresolved:
+        return "unverified", "No interactions found, but some drugs could not be matched in the database."
+    return "safe", "No interactions found."
+
+def interaction_match(m: dict) -> InteractionMatch:
+    return InteractionMatch(
+        type="drug-drug",
+        a=m['drug1'],
+        b=m['drug2'],
+        severity=m['severity'],
+        note=m['description']
+    )
+
+def food_interaction_match(m: dict) -> InteractionMatch:
+    return InteractionMatch(
+        type="drug-food",
+        a=m['drug'],
+        b=m['food'],
+        severity=m['severity'],
+        note=m['description']
+    )
+
+def interaction_matches(result: dict) -> List[InteractionMatch]:
+    return [interaction_match(m) for m in result["interactions"]] + [food_interaction_match(m) for m in result["food_interactions"]]
+
 @app.post("/safety/interactions/check", response_model=InteractionCheckResponse)
 async def check_drug_interactions(request: InteractionCheckRequest):
-    from services.interactions import interaction_service
+    interaction_service = await interaction_service_or_503()
     
     drug_names = [d.name for d in request.drugs]
     
-    matches = interaction_service.check_interactions(drug_names)
+    result = interaction_service.check_interactions_detailed(drug_names, request.foods)
+    unresolved = result["unresolved"]
     
-    response_matches = []
-    for m in matches:
-        response_matches.append({
-            "pair": [m['drug1'], m['drug2']],
-            "severity": m['severity'],
-            "description": m['description'],
-            "source": "Database"
-        })
+    response_matches = interaction_matches(result)
     
-    log_event("INTERACTION_CHECKED", None, {"drug_count": len(drug_names)})
+    log_event("INTERACTION_CHECKED", None, {
+        "drug_count": len(drug_names),
+        "food_count": len(request.foods),
+        "unresolved_count": len(unresolved)
+    })
+    
+    overall, explanation = interaction_overall(response_matches, unresolved)
     
     return InteractionCheckResponse(
-        overall="warning" if matches else "safe",
-        matches=[InteractionMatch(**m) for m in response_matches],
-        explanation="Interactions found in database." if matches else "No interactions found."
+        overall=overall,
+        matches=response_matches,
+        explanation=explanation,
+        resolved=result["resolved"],
+        unresolved=unresolved,
+        unresolved_foods=result["unresolved_foods"],
+        dataset_version=interaction_service.dataset_version
     )
 
+@app.post("/safety/interactions/check-batch")
+async def check_drug_interactions_batch(request: InteractionBatchRequest):
+    # Screens many medication lists (e.g. a nightly pharmacy reconciliation run) and
+    # streams one NDJSON line per list, with a single audit row for the whole batch.
+    if len(request.lists) > BATCH_SCREEN_MAX_LISTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_SCREEN_MAX_LISTS} lists per batch")
+
+    interaction_service = await interaction_service_or_503()
+    lists = request.lists
+
+    async def results():
+        totals = {"warning": 0, "unverified": 0, "safe": 0}
+        resolutions = {}
+
+        yield json.dumps({"event": "started", "total": len(lists), "dataset_version": interaction_service.dataset_version}) + "\n"
+
+        for start in range(0, len(lists), BATCH_SCREEN_CHUNK_SIZE):
+            chunk = lists[start:start + BATCH_SCREEN_CHUNK_SIZE]
+            # Resolution and pair lookup are CPU-bound; keep the event loop free between chunks
+            checked = await asyncio.to_thread(
+                interaction_service.check_interactions_batch,
+                [item.drugs for item in chunk], resolutions, [item.foods for item in chunk]
+            )
+            lines = []
+            for item, result in zip(chunk, checked):
+                matches = interaction_matches(result)
+                overall, _ = interaction_overall(matches, result["unresolved"])
+                totals[overall] += 1
+                lines.append(json.dumps({
+                    "event": "result",
+                    "id": item.id,
+                    "overall": overall,
+                    "matches": [m.model_dump() for m in matches],
+                    "unresolved": result["unresolved"],
+                    "unresolved_foods": result["unresolved_foods"]
+                }))
+            yield "\n".join(lines) + "\n"
+
+        log_event("INTERACTIONS_BATCH_CHECKED", None, {
+            "dataset_version": interaction_service.dataset_version,
+            "list_count": len(lists),
+            "distinct_drug_count": len(resolutions),
+            **totals
+        })
+
+        yield json.dumps({"event": "completed", "total": len(lists), **totals}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/admin/interactions/reload", dependencies=[Depends(require_admin)])
+async def reload_interactions():
+    # Rebuilds from the dataset files off the event loop; checks keep running on the
+    # current dataset until the validated replacement is swapped in.
+    previous = None
+    if interaction_service_status() == "ready":
+        previous = (await get_interaction_service()).dataset_version
+    try:
+        service = await asyncio.to_thread(reload_interaction_service)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except InteractionReloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    log_event("INTERACTIONS_RELOADED", None, {"previous_version": previous, "dataset_version": service.dataset_version})
+    return {
+        "status": "reloaded",
+        "previous_version": previous,
+        "dataset_version": service.dataset_version,
+        "interactions": len(service._index)
+    }
+
+@app.get("/admin/executor", dependencies=[Depends(require_admin)])
+async def get_executor_stats():
+    return executor_stats()
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_request_profiles():
+    return {"profiles": list_request_profiles()}
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile_detail(profile_id: str):
+    profile = get_request_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/admin/profiles/{profile_id}/pstats", dependencies=[Depends(require_admin)])
+async def download_request_profile(profile_id: str):
+    data = get_request_pstats(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(data, media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'})
+
+@app.delete("/admin/profiles", dependencies=[Depends(require_admin)])
+async def delete_request_profiles():
+    return {"removed": clear_request_profiles()}
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+async def get_recent_traces(limit: int = Query(50, ge=1, le=500)):
+    return {"traces": recent_traces(limit)}
+
+@app.get("/admin/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace_spans(trace_id: str):
+    spans = get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+@app.get("/drugs/suggest", response_model=DrugSuggestResponse)
+async def suggest_drugs(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    # Called per keystroke from the drug-interactions form, so it is served entirely
+    # from the in-memory prefix index and not audited.
+    interaction_service = await interaction_service_or_503()
+    return DrugSuggestResponse(query=q, suggestions=interaction_service.suggest_drugs(q, limit))
+
 @app.get("/files/documents/{document_id}")
 async def download_document(document_id: str):
     with get_db() as conn:
@@ -532,12 +891,78 @@ async def create_record_compat(request: dict):
 class PrescriptionAnalysisRequest(BaseModel):
     text: Optional[str] = None
 
+PRESCRIPTION_CACHE_NAMESPACE = "prescription"
+# Bump whenever either prescription prompt below changes so cached results are not reused.
+PRESCRIPTION_PROMPT_VERSION = "v1"
+PRESCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("PRESCRIPTION_CACHE_MAX_ENTRIES", "2000"))
+PRESCRIPTION_CACHE_TTL_HOURS = float(os.getenv("PRESCRIPTION_CACHE_TTL_HOURS", "24"))
+
+def get_cached_prescription(content_hash: str, provider: str, model_name: str):
+    return get_cached(
+        PRESCRIPTION_CACHE_NAMESPACE, content_hash, provider, model_name, PRESCRIPTION_PROMPT_VERSION,
+        ttl_hours=PRESCRIPTION_CACHE_TTL_HOURS
+    )
+
+def put_cached_prescription(content_hash: str, provider: str, model_name: str, result: dict):
+    put_cached(
+        PRESCRIPTION_CACHE_NAMESPACE, content_hash, provider, model_name, PRESCRIPTION_PROMPT_VERSION, result,
+        max_entries=PRESCRIPTION_CACHE_MAX_ENTRIES, ttl_hours=PRESCRIPTION_CACHE_TTL_HOURS
+    )
+
+# Medications from prescriptions analysed while the interaction data is loading are added
+# once it is ready; they are dropped (and logged) if it is still unavailable after this.
+PRESCRIPTION_PROFILE_DEFER_SECONDS = 3600
+_deferred_profile_updates = set()
+
+def add_prescription_medications(interaction_service, patient_id: str, medications: list) -> MedicationProfile:
+    # Extracted medications join the patient's active list; only pairs involving
+    # the new drugs are checked against the interaction dataset.
+    added = add_medications(interaction_service, patient_id, medications, "prescription")
+    profile = medication_profile_response(get_profile(interaction_service, patient_id))
+    log_event("MEDICATIONS_ADDED", patient_id, {"added": len(added), "evaluated_pairs": profile.evaluated_pairs})
+    return profile
+
+async def add_prescription_medications_when_ready(patient_id: str, medications: list):
+    deadline = asyncio.get_running_loop().time() + PRESCRIPTION_PROFILE_DEFER_SECONDS
+    while True:
+        try:
+            interaction_service = await get_interaction_service()
+            break
+        except asyncio.TimeoutError:
+            pass
+        except InteractionServiceUnavailableError:
+            await asyncio.sleep(INTERACTIONS_RETRY_SECONDS)
+        if asyncio.get_running_loop().time() > deadline:
+            log_event("MEDICATIONS_ADD_FAILED", patient_id, {"medications": len(medications), "reason": "interaction data unavailable"})
+            return
+    add_prescription_medications(interaction_service, patient_id, medications)
+
+async def add_prescription_to_profile(result: dict, patient_id: Optional[str]) -> dict:
+    if patient_id and isinstance(result.get("medications"), list):
+        medications = [m for m in result["medications"] if isinstance(m, dict)]
+        try:
+            interaction_service = await get_interaction_service()
+        except (asyncio.TimeoutError, InteractionServiceUnavailableError):
+            # The model call is already paid for, so the analysis is returned now and the
+            # profile is updated in the background instead of failing the request with 503.
+            task = asyncio.create_task(add_prescription_medications_when_ready(patient_id, medications))
+            _deferred_profile_updates.add(task)
+            task.add_done_callback(_deferred_profile_updates.discard)
+            return {**result, "medicationProfile": None, "medicationProfileStatus": "pending"}
+        profile = add_prescription_medications(interaction_service, patient_id, medications)
+        result = {**result, "medicationProfile": profile.model_dump(), "medicationProfileStatus": "updated"}
+    return result
+
 @app.post("/api/analyze/prescription-upload")
-async def analyze_prescription_upload(file: UploadFile = File(...)):
-    from services.gemini import configure_gemini, GEMINI_API_KEY, GEMINI_MODEL
-    import google.generativeai as genai
-    from PIL import Image
-    import io
+async def analyze_prescription_upload(
+        response: Response,
+        file: UploadFile = File(...),
+        patient_id: Optional[str] = Form(None),
+        refresh: bool = Query(False)):
+    from services.gemini import get_gemini_model, GEMINI_API_KEY, GEMINI_MODEL
+    
+    if patient_id:
+        ensure_patient(patient_id)
     
     if not GEMINI_API_KEY:
         return {
@@ -548,26 +973,36 @@ async def analyze_prescription_upload(file: UploadFile = File(...)):
             "warnings": ["Please consult with healthcare provider for complete analysis"],
             "recommendations": ["Configure GEMINI_API_KEY for AI-powered prescription analysis"]
         }
+    
+    content = await file.read()
+    content_hash = hash_bytes(content)
+    # Images and PDFs reach the model as different inputs, so they are cached separately
+    cache_provider = "gemini-vision" if (file.content_type or "").startswith("image/") else "gemini-pdf"
+    
+    # WhatsApp retries and pharmacists re-checking send the same bytes again
+    cached = None if refresh else get_cached_prescription(content_hash, cache_provider, GEMINI_MODEL)
+    response.headers["X-Cache"] = "HIT" if cached is not None else "MISS"
+    if cached is not None:
+        log_event("PRESCRIPTION_ANALYZED", patient_id, {"method": cache_provider, "cached": True})
+        return await add_prescription_to_profile(cached, patient_id)
         
     try:
-        configure_gemini()
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        content = await file.read()
+        model = get_gemini_model(GEMINI_MODEL)
         
         image_part = None
         text_part = None
         
         if file.content_type.startswith("image/"):
-            image = Image.open(io.BytesIO(content))
-            image_part = image
+            # Decoding and re-encoding happen in the CPU process pool, off the event loop
+            image_part = {"mime_type": "image/jpeg", "data": await run_in_process(encode_image_bytes, content)}
         elif file.content_type == "application/pdf":
             # For PDF, we might need to extract text or convert to image
             # For simplicity in this demo, we'll try to extract text
             from services.gemini import extract_text_from_pdf_bytes
-            text_part = extract_text_from_pdf_bytes(content)
+            text_part = await run_in_process(extract_text_from_pdf_bytes, content)
         else:
-            return JSONResponse(status_code=400, content={"error": "Unsupported file type"})
+            # A Response returned directly skips the injected `response` headers
+            return JSONResponse(status_code=400, content={"error": "Unsupported file type"}, headers={"X-Cache": "MISS"})
 
         prompt = """You are a clinical pharmacist assistant. Analyze this prescription image/text and extract the following information. Respond in valid JSON format only.
 
@@ -589,10 +1024,11 @@ Important: Only return the JSON object, no markdown or extra text."""
         elif text_part:
             inputs.append(text_part)
         else:
-             return JSONResponse(status_code=400, content={"error": "Could not process file content"})
+            return JSONResponse(status_code=400, content={"error": "Could not process file content"}, headers={"X-Cache": "MISS"})
 
-        response = model.generate_content(inputs)
-        text = response.text.strip()
+        with model_call("gemini", "prescription_upload"):
+            generated = model.generate_content(inputs)
+        text = generated.text.strip()
         
         if text.startswith("```"):
             text = text.split("```")[1]
@@ -603,9 +1039,12 @@ Important: Only return the JSON object, no markdown or extra text."""
         import json
         result = json.loads(text)
         
-        log_event("PRESCRIPTION_ANALYZED", None, {"method": "gemini-vision"})
-        return result
+        put_cached_prescription(content_hash, cache_provider, GEMINI_MODEL, result)
         
+        log_event("PRESCRIPTION_ANALYZED", patient_id, {"method": cache_provider})
+    except ExecutorUnavailableError:
+        # Answered as a 503 with Retry-After by the exception handler, not as an analysis error
+        raise
     except Exception as e:
         log_event("PRESCRIPTION_ANALYSIS_ERROR", None, {"error": str(e)[:100]})
         return {
@@ -615,10 +1054,14 @@ Important: Only return the JSON object, no markdown or extra text."""
             "recommendations": ["Please try again"]
         }
 
+    return await add_prescription_to_profile(result, patient_id)
+
 @app.post("/api/analyze/prescription")
-async def analyze_prescription_compat(request: PrescriptionAnalysisRequest = None):
-    from services.gemini import configure_gemini, GEMINI_API_KEY, GEMINI_MODEL
-    import google.generativeai as genai
+async def analyze_prescription_compat(
+        response: Response,
+        request: PrescriptionAnalysisRequest = None,
+        refresh: bool = Query(False)):
+    from services.gemini import get_gemini_model, GEMINI_API_KEY, GEMINI_MODEL
     
     prescription_text = request.text if request and request.text else "Standard prescription for review"
     
@@ -632,9 +1075,16 @@ async def analyze_prescription_compat(request: PrescriptionAnalysisRequest = Non
             "recommendations": ["Configure GEMINI_API_KEY for AI-powered prescription analysis"]
         }
     
+    # Whitespace differences from copy/paste do not change the prescription
+    content_hash = hash_bytes(" ".join(prescription_text.split()).encode("utf-8"))
+    cached = None if refresh else get_cached_prescription(content_hash, "gemini-text", GEMINI_MODEL)
+    response.headers["X-Cache"] = "HIT" if cached is not None else "MISS"
+    if cached is not None:
+        log_event("PRESCRIPTION_ANALYZED", None, {"method": "gemini", "cached": True})
+        return cached
+    
     try:
-        configure_gemini()
-        model = genai.GenerativeModel(GEMINI_MODEL)
+        model = get_gemini_model(GEMINI_MODEL)
         
         prompt = f"""You are a clinical pharmacist assistant. Analyze this prescription and extract the following information. Respond in valid JSON format only.
 
@@ -652,8 +1102,9 @@ Respond with this exact JSON structure:
 
 Important: Only return the JSON object, no markdown or extra text."""
 
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        with model_call("gemini", "prescription_text"):
+            generated = model.generate_content(prompt)
+        text = generated.text.strip()
         
         if text.startswith("```"):
             text = text.split("```")[1]
@@ -663,6 +1114,7 @@ Important: Only return the JSON object, no markdown or extra text."""
         
         import json
         result = json.loads(text)
+        put_cached_prescription(content_hash, "gemini-text", GEMINI_MODEL, result)
         
         log_event("PRESCRIPTION_ANALYZED", None, {"method": "gemini"})
         return result
@@ -682,8 +1134,9 @@ class DrugInteractionCompatRequest(BaseModel):
 
 @app.post("/api/analyze/drug-interactions")
 async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest):
-    import google.generativeai as genai
-    from services.interactions import interaction_service
+    from services.gemini import get_gemini_model
+    
+    interaction_service = await interaction_service_or_503()
     
     # Load environment variables properly
     import pathlib
@@ -698,7 +1151,9 @@ async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest
     drug_names = [d["name"] for d in drugs if d["name"]]
     
     # 1. Check local dataset
-    found_interactions = interaction_service.check_interactions(drug_names)
+    check = interaction_service.check_interactions_detailed(drug_names)
+    found_interactions = check["interactions"]
+    unresolved_names = [u["name"] for u in check["unresolved"]]
     
     # 2. Prepare prompt for Gemini
     patient_details = request.personalDetails
@@ -718,6 +1173,9 @@ async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest
     Interactions found in database:
     {json.dumps(found_interactions, indent=2)}
     
+    Drugs that could not be matched in the database (check these with your own knowledge):
+    {json.dumps(unresolved_names)}
+    
     Task:
     1. Review the drugs and the found interactions.
     2. If database interactions are found, explain them clearly.
@@ -734,24 +1192,27 @@ async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest
     }}
     """
     
-    log_event("INTERACTION_CHECKED", None, {"drug_count": len(drugs), "database_matches": len(found_interactions)})
+    log_event("INTERACTION_CHECKED", None, {"drug_count": len(drugs), "database_matches": len(found_interactions), "unresolved_count": len(unresolved_names)})
 
     if not api_key:
         # Fallback if no API key
         return {
-            "status": "warning" if found_interactions else "safe",
+            "status": "warning" if found_interactions or unresolved_names else "safe",
             "explanation": "Gemini API key not configured. Showing database results only. " + 
-                           (f"Found {len(found_interactions)} interactions: " + ", ".join([i['description'] for i in found_interactions]) if found_interactions else "No interactions found in local database."),
-            "suggestions": ["Configure Gemini API key for full analysis", "Consult a pharmacist"]
+                           (f"Found {len(found_interactions)} interactions: " + ", ".join([i['description'] for i in found_interactions]) if found_interactions else "No interactions found in local database.") +
+                           (f" Not found in database: {', '.join(unresolved_names)}." if unresolved_names else ""),
+            "suggestions": ["Configure Gemini API key for full analysis", "Consult a pharmacist"],
+            "unresolvedDrugs": check["unresolved"],
+            "datasetVersion": interaction_service.dataset_version
         }
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
+        model = get_gemini_model(model_name, api_key=api_key)
+        with model_call("gemini", "drug_interactions"):
+            generated = model.generate_content(prompt)
         
         # Parse JSON from response
-        text = response.text.strip()
+        text = generated.text.strip()
         # Clean up markdown code blocks if present
         if text.startswith("```json"):
             text = text[7:]
@@ -761,6 +1222,8 @@ async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest
             text = text[:-3]
         
         result = json.loads(text)
+        result["unresolvedDrugs"] = check["unresolved"]
+        result["datasetVersion"] = interaction_service.dataset_version
         return result
         
     except Exception as e:
@@ -768,13 +1231,24 @@ async def analyze_drug_interactions_compat(request: DrugInteractionCompatRequest
         return {
             "status": "warning",
             "explanation": f"Error during AI analysis: {str(e)}. Database found {len(found_interactions)} interactions.",
-            "suggestions": ["Consult a pharmacist manually"]
+            "suggestions": ["Consult a pharmacist manually"],
+            "unresolvedDrugs": check["unresolved"],
+            "datasetVersion": interaction_service.dataset_version
         }
 
+SCAN_CACHE_NAMESPACE = "scan_analysis"
+# Bump whenever either scan prompt below changes so cached reports are not reused.
+SCAN_PROMPT_VERSION = "v1"
+
+def scan_cache_identity(use_hf: bool, model_name: str):
+    from services.medgemma import get_model
+    if use_hf:
+        return "medgemma+gemini", f"{get_model()}+{model_name}"
+    return "gemini-vision", model_name
+
 @app.post("/api/analyze/scan")
-async def analyze_scan_compat(file: UploadFile = File(...)):
-    import google.generativeai as genai
-    from services.medgemma import analyze_medical_image
+async def analyze_scan_compat(file: UploadFile = File(...), refresh: bool = Query(False)):
+    from services.gemini import get_gemini_model
     
     # Load environment variables properly
     import pathlib
@@ -785,18 +1259,15 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
     api_key = os.getenv("GEMINI_API_KEY")
     model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     
-    # 1. Save file temporarily
-    temp_filename = f"temp_scan_{uuid.uuid4()}.{file.filename.split('.')[-1]}"
-    temp_path = os.path.join(IMAGES_DIR, temp_filename)
+    spool = None
     
     try:
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-            
+        # 1. Buffer the upload once (in memory, or a named temp file when large) and hash it
+        spool, content_hash = await spool_upload(file)
+
         # Check if we have a valid HF token
         hf_token = os.getenv("HF_TOKEN")
-        use_hf = hf_token and hf_token != "your_huggingface_token_here"
+        use_hf = bool(hf_token and hf_token != "your_huggingface_token_here")
 
         if not api_key:
             return {
@@ -804,18 +1275,26 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
                 "findings": ["Please configure GEMINI_API_KEY in .env"],
                 "recommendations": ["System configuration required"]
             }
-            
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
+
+        # Identical bytes analysed by the same pipeline return the stored report unless refresh=true
+        if not refresh:
+            cache_provider, cache_model = scan_cache_identity(use_hf, model_name)
+            cached = get_cached(SCAN_CACHE_NAMESPACE, content_hash, cache_provider, cache_model, SCAN_PROMPT_VERSION)
+            if cached is not None:
+                return cached
+
+        model = get_gemini_model(model_name, api_key=api_key)
+        fell_back = False
         
         if use_hf:
             # 2a. Analyze with Hugging Face (MedGemma)
-            hf_analysis = await analyze_medical_image(temp_path)
+            hf_analysis = await analyze_medical_image_buffer(spool, content_hash, file.filename or "scan")
             
             # Additional check: If MedGemma failed (returned None) or returned Mock data signature
             if hf_analysis is None or "Appears to be brain MRI scan" in hf_analysis:
                 print("MedGemma failed or returned mock. Falling back to Gemini.")
-                use_hf = False 
+                use_hf = False
+                fell_back = True
             
         if use_hf:
             prompt = f"""
@@ -839,12 +1318,18 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
                 "recommendations": ["Recommendation 1", "Recommendation 2", ...]
             }}
             """
-            response = model.generate_content(prompt)
+            with model_call("gemini", "scan_report"):
+                generated = model.generate_content(prompt)
         else:
             # 2b. Analyze directly with Gemini Vision
             print("HF_TOKEN missing or default. Using Gemini Vision directly.")
-            import PIL.Image
-            img = PIL.Image.open(temp_path)
+            # Large uploads are decoded by path in the worker rather than pickled across
+            spool_path = spooled_path(spool)
+            if spool_path is not None:
+                spool.flush()
+                img = {"mime_type": "image/jpeg", "data": await run_in_process(encode_image_file, spool_path)}
+            else:
+                img = {"mime_type": "image/jpeg", "data": await run_in_process(encode_image_bytes, spool.getvalue())}
             
             prompt = """
             You are an expert medical imaging assistant.
@@ -869,8 +1354,9 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
                 "recommendations": ["Recommendation 1", "Recommendation 2", ...]
             }
             """
-            response = model.generate_content([prompt, img])
-        text = response.text.strip()
+            with model_call("gemini", "scan_vision"):
+                generated = model.generate_content([prompt, img])
+        text = generated.text.strip()
         
         # Clean up markdown
         if text.startswith("```json"):
@@ -879,9 +1365,19 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
             text = text[3:]
         if text.endswith("```"):
             text = text[:-3]
-            
-        return json.loads(text)
 
+        result = json.loads(text)
+
+        # A fallback report is not cached: the next request for this scan should get the
+        # configured MedGemma pipeline again once it recovers, not a stored stand-in.
+        if not fell_back:
+            cache_provider, cache_model = scan_cache_identity(use_hf, model_name)
+            put_cached(SCAN_CACHE_NAMESPACE, content_hash, cache_provider, cache_model, SCAN_PROMPT_VERSION, result)
+
+        return result
+
+    except ExecutorUnavailableError:
+        raise
     except Exception as e:
         print(f"Scan Analysis Error: {e}")
         import traceback
@@ -897,12 +1393,8 @@ async def analyze_scan_compat(file: UploadFile = File(...)):
             }
         )
     finally:
-        # Cleanup
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except Exception as e:
-                print(f"Cleanup Error (Ignored): {e}")
+        if spool is not None:
+            spool.close()
 
 class ChatRequest(BaseModel):
     message: str
@@ -911,33 +1403,33 @@ class ChatRequest(BaseModel):
 
 @app.post("/api/chat/vision")
 async def chat_vision(file: UploadFile = File(...), question: str = Form(...)):
-    import google.generativeai as genai
-    import PIL.Image
-    import io
+    from services.gemini import get_gemini_model
 
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         return JSONResponse(status_code=500, content={"error": "GEMINI_API_KEY not configured"})
 
     try:
-        genai.configure(api_key=api_key)
         # Use a vision-capable model
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = get_gemini_model('gemini-1.5-flash', api_key=api_key)
         
         content = await file.read()
-        image = PIL.Image.open(io.BytesIO(content))
+        image = {"mime_type": "image/jpeg", "data": await run_in_process(encode_image_bytes, content)}
         
         prompt = f"You are a medical assistant. Answer this question about the image: {question}. \n\nLanguage Rule: Answer in the same language as the question (English, Telugu, Tanglish)."
         
-        response = model.generate_content([prompt, image])
-        return {"answer": response.text}
+        with model_call("gemini", "chat_vision"):
+            generated = model.generate_content([prompt, image])
+        return {"answer": generated.text}
+    except ExecutorUnavailableError:
+        raise
     except Exception as e:
         print(f"Vision Error: {e}")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.post("/api/chat")
 async def chat_compat(request: ChatRequest):
-    import google.generativeai as genai
+    from services.gemini import get_gemini_model
     
     # Load environment variables properly
     import pathlib
@@ -961,8 +1453,7 @@ async def chat_compat(request: ChatRequest):
         }
     
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
+        model = get_gemini_model(model_name, api_key=api_key)
         
         context_prompts = {
             "prescription": "You are a helpful clinical pharmacist assistant. Answer questions about prescriptions, medications, dosages, and drug safety. Be concise and professional.",
@@ -981,12 +1472,13 @@ User question: {request.message}
 
 Provide a helpful, concise response. Do not provide specific diagnoses - always recommend consulting with healthcare providers for medical decisions."""
 
-        response = model.generate_content(prompt)
+        with model_call("gemini", "chat"):
+            generated = model.generate_content(prompt)
         
         return {
             "id": str(uuid.uuid4().hex[:12]),
             "role": "assistant",
-            "content": response.text.strip(),
+            "content": generated.text.strip(),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
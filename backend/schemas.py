@@ -50,6 +50,21 @@ class Image(BaseModel):
 class ImageList(BaseModel):
     items: List[Image]
 
+class AnalysisJob(BaseModel):
+    id: str
+    patient_id: str
+    image_id: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    attempts: int
+    max_attempts: int
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+class AnalysisJobList(BaseModel):
+    items: List[AnalysisJob]
+
 class SummaryResponse(BaseModel):
     bullets: List[str]
     created_at: str
@@ -81,19 +96,84 @@ class InteractionCheckRequest(BaseModel):
     foods: List[str] = []
 
 class InteractionMatch(BaseModel):
-    type: str
+    type: str  # "drug-drug" or "drug-food"
     a: str
     b: str
     severity: Optional[str] = None
     note: Optional[str] = None
 
+class DrugCandidate(BaseModel):
+    name: str
+    drug_id: str
+    score: float
+
+class ResolvedDrug(BaseModel):
+    name: str
+    drug_id: str
+    matched_name: str
+    score: float
+    method: str  # "exact", "normalized" or "fuzzy"
+
+class UnresolvedDrug(BaseModel):
+    name: str
+    candidates: List[DrugCandidate] = []
+
 class InteractionCheckResponse(BaseModel):
     overall: str
     matches: List[InteractionMatch]
     explanation: str
+    resolved: List[ResolvedDrug] = []
+    unresolved: List[UnresolvedDrug] = []
+    unresolved_foods: List[str] = []
+    dataset_version: Optional[str] = None
+
+class MedicationList(BaseModel):
+    id: str
+    drugs: List[str]
+    foods: List[str] = []
+
+class InteractionBatchRequest(BaseModel):
+    lists: List[MedicationList]
+
+class MedicationInput(BaseModel):
+    name: str
+    dosage: str = ""
+    frequency: str = ""
+
+class MedicationAddRequest(BaseModel):
+    medications: List[MedicationInput]
+
+class PatientMedication(BaseModel):
+    id: str
+    name: str
+    dosage: str
+    frequency: str
+    drug_id: Optional[str] = None
+    source: str  # "prescription" or "manual"
+    added_at: str
+
+class MedicationProfile(BaseModel):
+    patient_id: str
+    medications: List[PatientMedication]
+    overall: str
+    matches: List[InteractionMatch]
+    unresolved: List[str] = []
+    dataset_version: Optional[str] = None
+    evaluated_pairs: int = 0  # pairs checked against the dataset for this response; the rest were cached
+
+class DrugSuggestion(BaseModel):
+    name: str
+    drug_id: str
+
+class DrugSuggestResponse(BaseModel):
+    query: str
+    suggestions: List[DrugSuggestion]
 
 class HealthResponse(BaseModel):
     status: str
+    ready: bool = True
+    interactions: Optional[str] = None  # "loading", "ready" or "failed"
+    dataset_version: Optional[str] = None
 
 class UserCreate(BaseModel):
     username: str
@@ -107,8 +187,7 @@ class UserLogin(BaseModel):
     role: Optional[str] = None
 
 class AuthResponse(BaseModel):
-    token: str # For now we might just return user info, but token is better practice. 
-    # Since we are doing simple auth, maybe just return user details and handle session on client or simple token
+    token: str  # Signed, expiring bearer token carrying user_id, role and patient_id
     user_id: str
     username: str
     role: str
@@ -0,0 +1,41 @@
+"""Compile data_final_v5.csv and drugs_synonyms.json into the memory-mapped
+interaction index loaded by services/interactions.py.
+
+    python scripts/build_interaction_index.py
+    python scripts/build_interaction_index.py --csv path/to.csv --synonyms path/to.json --out path/to.idx
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.interaction_store import build_index_file, MappedInteractionIndex
+
+
+def main():
+    from services.interactions import INTERACTIONS_PATH, DRUG_SYNONYMS_PATH, INTERACTION_INDEX_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=INTERACTIONS_PATH)
+    parser.add_argument("--synonyms", default=DRUG_SYNONYMS_PATH)
+    parser.add_argument("--out", default=INTERACTION_INDEX_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    header = build_index_file(args.csv, args.synonyms, args.out)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    MappedInteractionIndex(args.out)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    counts = header["counts"]
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB, dataset version {header['dataset_version']})")
+    print(f"  {counts['drugs']} drugs, {counts['interactions']} interactions, {counts['names']} names")
+    print(f"  built in {build_seconds:.2f}s, maps in {load_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
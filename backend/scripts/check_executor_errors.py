@@ -0,0 +1,69 @@
+"""Check that every endpoint which preprocesses uploads in the CPU process pool answers
+503 with Retry-After when the pool is unavailable, rather than a 500 or an error body.
+
+A task timeout far below process start-up time makes each pool call fail the way a
+stuck worker does, so the real timeout and pool-replacement path is exercised. Runs
+against a throwaway database and storage directory; exits non-zero on a failure.
+
+    python scripts/check_executor_errors.py
+"""
+import io
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# Scans go straight to the Gemini Vision branch, which encodes in the pool
+os.environ["HF_TOKEN"] = ""
+os.environ["IMPORT_WARMUP"] = "false"
+os.environ.setdefault("GEMINI_API_KEY", "check")
+
+from common import isolated_backend, stub_gemini
+
+
+def _png() -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (120, 40, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run(timeout_seconds: float) -> bool:
+    from fastapi.testclient import TestClient
+    from services import executor
+    import main
+
+    executor.CPU_PROCESS_WORKERS = max(1, executor.CPU_PROCESS_WORKERS)
+    executor.PROCESS_TASK_TIMEOUT_SECONDS = timeout_seconds
+    image = ("scan.png", _png(), "image/png")
+    routes = [
+        ("/api/analyze/prescription-upload", {"files": {"file": image}}),
+        ("/api/analyze/scan?refresh=true", {"files": {"file": image}}),
+        ("/api/chat/vision", {"files": {"file": image}, "data": {"question": "What is shown?"}}),
+    ]
+
+    ok = True
+    with isolated_backend(), stub_gemini(0):
+        client = TestClient(main.app)
+        for path, kwargs in routes:
+            response = client.post(path, **kwargs)
+            passed = response.status_code == 503 and "retry-after" in response.headers
+            ok = ok and passed
+            print(f"{'ok  ' if passed else 'FAIL'} {path:<36} {response.status_code} "
+                  f"Retry-After={response.headers.get('retry-after')} {response.text[:80]}")
+    executor.shutdown_executors()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a failing CPU process pool gives 503 on the upload routes.")
+    parser.add_argument("--timeout", type=float, default=0.001, help="process task timeout to force, in seconds")
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.timeout) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Fill a database and storage directory with synthetic patients, users, documents,
+images and audit logs for load testing, and/or write a synthetic interaction dataset.
+
+Rows are written with bulk inserts. Document and image files come from a pool of
+generated PDFs, text notes and JPEGs that rows share, so a million documents do not
+need a million files on disk (pass --unique-files to write one file per row instead).
+
+    python scripts/generate_synthetic_data.py --db /tmp/load.db --storage /tmp/load_storage --patients 100000
+    DB_PATH=/tmp/load.db STORAGE_DIR=/tmp/load_storage uvicorn main:app
+
+    python scripts/generate_synthetic_data.py --patients 0 --dataset-dir /tmp/ds --drugs 5000 --interactions 1000000
+    DATASET_DIR=/tmp/ds uvicorn main:app
+
+Every generated user has the password given by --password.
+"""
+import os
+import io
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INSERT_CHUNK = 10000
+
+SYLLABLES = ["met", "for", "min", "am", "lo", "di", "pine", "ator", "va", "sta", "tin", "pra", "zol",
+             "ome", "cil", "lin", "amox", "ici", "cef", "tri", "ax", "one", "war", "far", "in", "clo"]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Ishaan", "Diya",
+               "Rahul", "Sneha", "Karan", "Pooja", "Aditya", "Neha", "Sanjay", "Lakshmi", "Imran", "Fatima"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Khan", "Singh", "Gupta", "Nair", "Das", "Mehta", "Rao", "Joshi"]
+ADVERSE_EFFECTS = ["Nausea", "Dizziness", "Bleeding", "Hypotension", "QT prolongation", "Hypoglycemia", "Drowsiness"]
+FOODS = {
+    "grapefruit": ["grapefruit juice", "pomelo"],
+    "alcohol": ["beer", "wine", "ethanol"],
+    "dairy": ["milk", "cheese", "yogurt"],
+    "leafy greens": ["spinach", "kale"],
+    "caffeine": ["coffee", "tea"],
+}
+AUDIT_EVENTS = ("DOCUMENT_UPLOADED", "IMAGE_UPLOADED", "SUMMARY_GENERATED", "QA_ASKED", "INTERACTION_CHECKED")
+
+
+def _chunks(rows, size=INSERT_CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bulk_insert(conn, sql: str, rows) -> int:
+    count = 0
+    for chunk in _chunks(rows):
+        conn.executemany(sql, chunk)
+        count += len(chunk)
+    return count
+
+
+def _make_jpeg(rng: random.Random, size: int) -> bytes:
+    from PIL import Image, ImageDraw
+
+    # Grey gradient with a few bright blobs, roughly scan-like and compressible like one
+    image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(3, 8)):
+        x, y, r = rng.randrange(size), rng.randrange(size), rng.randint(size // 20, size // 6)
+        shade = rng.randint(150, 255)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=(shade, shade, shade))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def _make_note(rng: random.Random) -> bytes:
+    from benchmarks.common import WORDS
+
+    lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "." for _ in range(rng.randint(10, 40))]
+    return "\n".join(lines).encode("utf-8")
+
+
+class _FilePool:
+    # Writes `size` files per kind up front and hands their paths out round-robin, or
+    # writes a fresh file per row when unique is set.
+
+    def __init__(self, directory: str, kinds, size: int, unique: bool, rng: random.Random, pdf_pages, image_size: int):
+        from benchmarks.common import make_text_pdf
+
+        self.directory = directory
+        self.unique = unique
+        self.rng = rng
+        makers = {
+            "pdf": lambda: make_text_pdf(rng.randint(*pdf_pages), seed=rng.randrange(1 << 30)),
+            "txt": lambda: _make_note(rng),
+            "jpg": lambda: _make_jpeg(rng, image_size),
+        }
+        self.makers = {kind: makers[kind] for kind in kinds}
+        self.pool = {kind: [] for kind in self.makers}
+        self.bytes_written = 0
+        if not unique:
+            for kind in self.makers:
+                self.pool[kind] = [self._write(kind, f"synthetic_{kind}_{i}") for i in range(size)]
+
+    def _write(self, kind: str, name: str) -> str:
+        content = self.makers[kind]()
+        path = os.path.join(self.directory, f"{name}.{kind}")
+        with open(path, "wb") as f:
+            f.write(content)
+        self.bytes_written += len(content)
+        return path
+
+    def path(self, kind: str, row_id: str) -> str:
+        if self.unique:
+            return self._write(kind, row_id)
+        return self.rng.choice(self.pool[kind])
+
+
+def generate_records(args):
+    import bcrypt
+    import db
+    from services import files
+
+    db.DB_PATH = args.db
+    files.DOCUMENTS_DIR = os.path.join(args.storage, "documents")
+    files.IMAGES_DIR = os.path.join(args.storage, "images")
+    os.makedirs(files.DOCUMENTS_DIR, exist_ok=True)
+    os.makedirs(files.IMAGES_DIR, exist_ok=True)
+    db.init_db()
+
+    rng = random.Random(args.seed)
+    # Ids follow the app's prefix_<12 hex> format; the run tag keeps reruns from colliding
+    tag = f"{rng.getrandbits(16):04x}"
+    now = datetime.now(timezone.utc)
+    start_at = now - timedelta(days=args.days)
+    span_seconds = args.days * 86400
+
+    def timestamp() -> str:
+        return (start_at + timedelta(seconds=rng.random() * span_seconds)).isoformat()
+
+    # bcrypt takes ~0.2s per hash, so every synthetic user shares one
+    password_hash = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    documents = _FilePool(files.DOCUMENTS_DIR, ("pdf", "txt"), args.file_pool, args.unique_files, rng, args.pdf_pages, args.image_size)
+    images = _FilePool(files.IMAGES_DIR, ("jpg",), args.file_pool, args.unique_files, rng, args.pdf_pages, args.image_size)
+
+    patient_ids = [f"pat_{tag}{i:08x}" for i in range(args.patients)]
+    counts = {}
+    started = time.perf_counter()
+    with db.get_db() as conn:
+        conn.execute("PRAGMA synchronous = OFF")
+
+        counts["patients"] = _bulk_insert(conn, "INSERT INTO patients (id, name, phone, created_at) VALUES (?, ?, ?, ?)", (
+            (pid, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"+91{rng.randrange(10 ** 9, 10 ** 10)}" if rng.random() < 0.7 else None, timestamp())
+            for pid in patient_ids
+        ))
+
+        # One login per patient for the first --patient-users patients, plus doctors
+        patient_users = min(args.patient_users, args.patients)
+        counts["users"] = _bulk_insert(conn, "INSERT INTO users (id, username, password_hash, role, patient_id, created_at) VALUES (?, ?, ?, ?, ?, ?)", (
+            (f"usr_{tag}{i:08x}", f"doctor_{tag}_{i}" if i < args.doctors else f"patient_{tag}_{i - args.doctors}",
+             password_hash, "doctor" if i < args.doctors else "patient",
+             None if i < args.doctors else patient_ids[i - args.doctors], timestamp())
+            for i in range(args.doctors + patient_users)
+        ))
+
+        def document_rows():
+            serial = 0
+            for pid in patient_ids:
+                for _ in range(rng.randint(0, round(2 * args.documents_per_patient))):
+                    doc_id = f"doc_{tag}{serial:08x}"
+                    serial += 1
+                    if rng.random() < args.text_share:
+                        yield doc_id, pid, f"note_{serial}.txt", "text/plain", timestamp(), documents.path("txt", doc_id)
+                    else:
+                        yield doc_id, pid, f"report_{serial}.pdf", "application/pdf", timestamp(), documents.path("pdf", doc_id)
+
+        counts["documents"] = _bulk_insert(conn, "INSERT INTO documents (id, patient_id, filename, mime_type, submitted_at, storage_path) VALUES (?, ?, ?, ?, ?, ?)", document_rows())
+
+        def image_rows():
+            serial = 0
+            for pid in patient_ids:
+                for _ in range(rng.randint(0, round(2 * args.images_per_patient))):
+                    img_id = f"img_{tag}{serial:08x}"
+                    serial += 1
+                    yield img_id, pid, f"scan_{serial}.jpg", "image/jpeg", timestamp(), images.path("jpg", img_id)
+
+        counts["images"] = _bulk_insert(conn, "INSERT INTO images (id, patient_id, filename, mime_type, submitted_at, storage_path) VALUES (?, ?, ?, ?, ?, ?)", image_rows())
+
+        def audit_rows():
+            serial = 0
+            for pid in patient_ids:
+                yield f"aud_{tag}{serial:08x}", pid, "PATIENT_CREATED", json.dumps({"name": "synthetic"}), timestamp()
+                serial += 1
+                for _ in range(rng.randint(0, round(2 * args.audit_per_patient))):
+                    yield f"aud_{tag}{serial:08x}", pid, rng.choice(AUDIT_EVENTS), json.dumps({"synthetic": True}), timestamp()
+                    serial += 1
+
+        counts["audit_logs"] = _bulk_insert(conn, "INSERT INTO audit_logs (id, patient_id, event_type, payload_json, created_at) VALUES (?, ?, ?, ?, ?)", audit_rows())
+
+    elapsed = time.perf_counter() - started
+    print(f"Wrote to {args.db} in {elapsed:.1f}s: " + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"  {(documents.bytes_written + images.bytes_written) / 1e6:.1f} MB of files under {args.storage}")
+    if counts["users"]:
+        print(f"  log in as doctor_{tag}_0 or patient_{tag}_0 with password {args.password!r}")
+
+
+def _drug_names(rng: random.Random, count: int):
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+    return sorted(names)
+
+
+def generate_dataset(args):
+    # Same layout as dataset/: data_final_v5.csv, drugs_synonyms.json and the optional
+    # drug-food files. Drug ids are DrugBank-style (DB00001); each drug gets a generic
+    # and a brand name.
+    rng = random.Random(args.seed + 1)
+    os.makedirs(args.dataset_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    drug_ids = [f"DB{i + 1:05d}" for i in range(args.drugs)]
+    names = _drug_names(rng, args.drugs * 2)
+    rng.shuffle(names)
+    synonyms = {drug_id: [names[2 * i].capitalize(), names[2 * i + 1].upper()] for i, drug_id in enumerate(drug_ids)}
+    with open(os.path.join(args.dataset_dir, "drugs_synonyms.json"), "w", encoding="utf-8") as f:
+        json.dump(synonyms, f)
+
+    # A few "popular" drugs take part in far more interactions than the rest, as in real data
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(args.drugs)]
+    with open(os.path.join(args.dataset_dir, "data_final_v5.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Drug1", "Interaction", "Drug2", "Adverse Effects"])
+        for chunk_start in range(0, args.interactions, INSERT_CHUNK):
+            size = min(INSERT_CHUNK, args.interactions - chunk_start)
+            firsts = rng.choices(drug_ids, weights, k=size)
+            seconds = rng.choices(drug_ids, k=size)
+            for a, b in zip(firsts, seconds):
+                if a == b:
+                    b = drug_ids[(drug_ids.index(b) + 1) % len(drug_ids)]
+                writer.writerow([
+                    f"Compound::{a}",
+                    f"{synonyms[a][0]} may increase the {rng.choice(['serum concentration', 'adverse effects', 'activity'])} of {synonyms[b][0]}",
+                    f"Compound::{b}",
+                    rng.choice(ADVERSE_EFFECTS) if rng.random() < 0.7 else "",
+                ])
+
+    with open(os.path.join(args.dataset_dir, "food_synonyms.json"), "w", encoding="utf-8") as f:
+        json.dump(FOODS, f)
+    with open(os.path.join(args.dataset_dir, "drug_food_interactions.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Drug", "Food", "Interaction", "Severity"])
+        for drug_id in rng.sample(drug_ids, min(len(drug_ids), max(1, args.drugs // 20))):
+            food = rng.choice(list(FOODS))
+            writer.writerow([drug_id, food, f"{food.capitalize()} alters absorption of {synonyms[drug_id][0]}", rng.choice(["Major", "Moderate", "Minor", ""])])
+
+    print(f"Wrote interaction dataset to {args.dataset_dir} in {time.perf_counter() - started:.1f}s: "
+          f"{args.drugs} drugs, {args.interactions} interactions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("DB_PATH"), help="database to fill (default: $DB_PATH)")
+    parser.add_argument("--storage", default=os.getenv("STORAGE_DIR"),
+                        help="directory for documents/ and images/ (default: $STORAGE_DIR, else storage/ next to the database)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=365, help="spread timestamps over this many past days")
+
+    records = parser.add_argument_group("records")
+    records.add_argument("--patients", type=int, default=1000)
+    records.add_argument("--doctors", type=int, default=10)
+    records.add_argument("--patient-users", type=int, default=1000, help="patients that also get a login")
+    records.add_argument("--password", default="loadtest")
+    records.add_argument("--documents-per-patient", type=float, default=5, help="average; actual counts vary per patient")
+    records.add_argument("--images-per-patient", type=float, default=2)
+    records.add_argument("--audit-per-patient", type=float, default=10)
+    records.add_argument("--text-share", type=float, default=0.2, help="fraction of documents that are .txt notes")
+    records.add_argument("--pdf-pages", default="1,8", help="min,max pages per generated PDF")
+    records.add_argument("--image-size", type=int, default=1024, help="generated JPEG width and height")
+    records.add_argument("--file-pool", type=int, default=50, help="distinct files per kind shared by all rows")
+    records.add_argument("--unique-files", action="store_true", help="write one file per document/image row")
+
+    dataset = parser.add_argument_group("interaction dataset")
+    dataset.add_argument("--dataset-dir", help="write a synthetic interaction dataset here")
+    dataset.add_argument("--drugs", type=int, default=5000)
+    dataset.add_argument("--interactions", type=int, default=200000)
+    args = parser.parse_args()
+
+    args.pdf_pages = tuple(int(n) for n in args.pdf_pages.split(","))
+    if len(args.pdf_pages) != 2 or args.pdf_pages[0] < 1 or args.pdf_pages[0] > args.pdf_pages[1]:
+        parser.error("--pdf-pages must be min,max with 1 <= min <= max")
+
+    if args.patients > 0:
+        # Never default to backend/arogya.db, which holds the demo rows
+        if not args.db:
+            parser.error("pass --db or set DB_PATH to choose the database to fill")
+        args.storage = args.storage or os.path.join(os.path.dirname(os.path.abspath(args.db)), "storage")
+        generate_records(args)
+    if args.dataset_dir:
+        generate_dataset(args)
+    if args.patients <= 0 and not args.dataset_dir:
+        parser.error("nothing to generate: pass --patients > 0 and/or --dataset-dir")
+
+
+if __name__ == "__main__":
+    main()
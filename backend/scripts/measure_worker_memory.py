@@ -0,0 +1,113 @@
+"""Report per-process memory (RSS, PSS, shared, private) for the interaction index.
+
+PSS (proportional set size) splits each shared page between the processes that map it,
+so summing PSS across workers gives the real footprint, unlike RSS. Linux only.
+
+Measure a running deployment (master pid of gunicorn or `uvicorn --workers N`):
+
+    python scripts/measure_worker_memory.py --pid 12345
+
+Simulate N workers loading the index, either mapped (default) or parsed from CSV:
+
+    python scripts/measure_worker_memory.py --simulate 8 --mode mmap
+    python scripts/measure_worker_memory.py --simulate 8 --mode csv
+
+Set DATASET_DIR to point the simulation at another dataset folder.
+"""
+import os
+import sys
+import mmap
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_smaps_rollup(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0].rstrip(":") in FIELDS:
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values
+
+
+def child_pids(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def print_report(pids: list):
+    print(f"{'pid':>8} " + " ".join(f"{field:>14}" for field in FIELDS))
+    totals = dict.fromkeys(FIELDS, 0.0)
+    for pid in pids:
+        values = read_smaps_rollup(pid)
+        for field in FIELDS:
+            totals[field] += values.get(field, 0.0)
+        print(f"{pid:>8} " + " ".join(f"{values.get(field, 0.0):>11.1f} MB" for field in FIELDS))
+    print(f"{'total':>8} " + " ".join(f"{totals[field]:>11.1f} MB" for field in FIELDS))
+
+
+def _simulated_worker(mode: str, ready, done):
+    from services.interactions import InteractionService
+
+    service = object.__new__(InteractionService)
+    if mode == "csv":
+        service._index = service._load_csv_index()
+    else:
+        service._load_data()
+
+    # Fault in every page of the mapping, as a long-running worker eventually would
+    mapped = getattr(service._index, "_mm", None)
+    if mapped is not None:
+        for offset in range(0, len(mapped), mmap.PAGESIZE):
+            mapped[offset]
+
+    ready.set()
+    done.wait()
+
+
+def simulate(workers: int, mode: str):
+    ctx = multiprocessing.get_context("spawn")
+    done = ctx.Event()
+    processes = []
+    for _ in range(workers):
+        ready = ctx.Event()
+        process = ctx.Process(target=_simulated_worker, args=(mode, ready, done))
+        process.start()
+        ready.wait()
+        processes.append(process)
+
+    time.sleep(0.5)
+    print(f"{workers} workers, index mode: {mode}")
+    print_report([process.pid for process in processes])
+
+    done.set()
+    for process in processes:
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pid", type=int, help="master pid; its worker processes are reported")
+    parser.add_argument("--simulate", type=int, metavar="N", help="spawn N processes that load the index")
+    parser.add_argument("--mode", choices=("mmap", "csv"), default="mmap")
+    args = parser.parse_args()
+
+    if args.pid:
+        print_report([args.pid] + child_pids(args.pid))
+    elif args.simulate:
+        simulate(args.simulate, args.mode)
+    else:
+        parser.error("pass --pid or --simulate")
+
+
+if __name__ == "__main__":
+    main()
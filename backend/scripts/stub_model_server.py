@@ -0,0 +1,285 @@
+"""Local stand-in for the Gemini and MedGemma (Hugging Face) APIs, for load tests.
+
+Responses have the real shapes, but latency, error rate, 429 rate limiting and
+streaming speed are configurable, so timeouts, concurrency and caching can be
+exercised offline.
+
+    python scripts/stub_model_server.py --port 8090 --latency-ms 800 --jitter lognormal --error-rate 0.02 --rate-limit 0.05
+
+Point the backend at it:
+
+    GEMINI_API_KEY=stub GEMINI_BASE_URL=http://127.0.0.1:8090 \\
+    HF_TOKEN=stub HF_INFERENCE_ENDPOINT_URL=http://127.0.0.1:8090/models/medgemma \\
+    uvicorn main:app
+
+Settings can be changed while it runs, globally or per API ("gemini" / "medgemma"):
+
+    curl -X POST localhost:8090/_stub/config -d '{"latency_ms": 3000, "target": "gemini"}'
+    curl localhost:8090/_stub/stats
+"""
+import os
+import re
+import math
+import sys
+import json
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TARGETS = ("gemini", "medgemma")
+JITTER_MODES = ("fixed", "uniform", "exponential", "lognormal")
+
+SETTINGS = {
+    "latency_ms": 500.0,
+    "jitter": "lognormal",
+    # Spread for uniform (+/- this fraction) and lognormal (sigma)
+    "spread": 0.5,
+    "error_rate": 0.0,
+    "rate_limit": 0.0,
+    "retry_after_s": 2,
+    # Requests over this many in flight get 429, like a per-project quota (0 = unlimited)
+    "max_concurrency": 0,
+    "stream_chunks": 8,
+    "stream_chunk_ms": 80.0,
+}
+OVERRIDES: Dict[str, dict] = {target: {} for target in TARGETS}
+
+stats = Counter()
+in_flight = Counter()
+_rng = random.Random()
+
+app = FastAPI(title="Arogya stub model server")
+
+
+def settings_for(target: str) -> dict:
+    return {**SETTINGS, **OVERRIDES[target]}
+
+
+def sample_latency(config: dict) -> float:
+    mean = config["latency_ms"] / 1000
+    mode = config["jitter"]
+    if mode == "uniform":
+        return max(0.0, _rng.uniform(mean * (1 - config["spread"]), mean * (1 + config["spread"])))
+    if mode == "exponential":
+        return _rng.expovariate(1 / mean) if mean > 0 else 0.0
+    if mode == "lognormal" and mean > 0:
+        sigma = config["spread"]
+        # mu chosen so the distribution's mean equals latency_ms, with a long right tail
+        return _rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    return mean
+
+
+def failure(target: str, config: dict) -> Optional[JSONResponse]:
+    # Rate limiting is decided before the latency, as a real quota check would be
+    limit = config["max_concurrency"]
+    if (limit and in_flight[target] >= limit) or _rng.random() < config["rate_limit"]:
+        stats[f"{target}.429"] += 1
+        headers = {"Retry-After": str(config["retry_after_s"])}
+        if target == "gemini":
+            body = {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}}
+        else:
+            body = {"error": "Rate limit reached. You reached free usage limit (reset hourly)."}
+        return JSONResponse(body, status_code=429, headers=headers)
+    return None
+
+
+def server_error(target: str, config: dict) -> Optional[JSONResponse]:
+    if _rng.random() < config["error_rate"]:
+        stats[f"{target}.500"] += 1
+        if target == "gemini":
+            body = {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}}
+        else:
+            body = {"error": "Model is overloaded", "error_type": "overloaded"}
+        return JSONResponse(body, status_code=_rng.choice([500, 503]))
+    return None
+
+
+def _fill_template(value):
+    if isinstance(value, dict):
+        return {key: _fill_template(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill_template(value[0])] if value else []
+    if isinstance(value, str):
+        return f"Stub: {value}"
+    return value
+
+
+def gemini_text(prompt: str) -> str:
+    # Mirrors the output format each backend prompt asks for
+    if "bullet points" in prompt:
+        return "\n".join(f"- Stub finding {i}: records reviewed, no acute issue noted." for i in range(1, 6))
+    if "Sources:" in prompt:
+        return "Answer: Stub answer based on the provided records.\nSources: General Knowledge"
+    if "JSON" in prompt:
+        match = re.search(r"\{.*\}", prompt, re.DOTALL)
+        if match:
+            # The prompts embed an example object; fill every field of it
+            template = re.sub(r",\s*\.\.\.", "", match.group(0).replace("{{", "{").replace("}}", "}"))
+            template = re.sub(r",\s*([\]}])", r"\1", template)
+            try:
+                return json.dumps(_fill_template(json.loads(template)))
+            except ValueError:
+                pass
+        return json.dumps({"summary": "Stub response.", "findings": [], "recommendations": []})
+    return "This is a stub model response for load testing."
+
+
+def gemini_body(text: str, finish: Optional[str] = "STOP") -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text.split()), "totalTokenCount": len(text.split())},
+        "modelVersion": "stub",
+    }
+
+
+def prompt_text(body: dict) -> str:
+    return " ".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    # {model}:generateContent and {model}:streamGenerateContent
+    model, _, action = model_action.partition(":")
+    if action not in ("generateContent", "streamGenerateContent"):
+        return JSONResponse({"error": {"code": 404, "message": f"Unknown action {action}", "status": "NOT_FOUND"}}, status_code=404)
+
+    config = settings_for("gemini")
+    stats["gemini.requests"] += 1
+    rejected = failure("gemini", config)
+    if rejected:
+        return rejected
+
+    async def events(text: str):
+        # Time to first chunk follows the latency setting, then chunks arrive at a steady pace
+        words = text.split(" ")
+        size = max(1, -(-len(words) // config["stream_chunks"]))
+        chunks = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        try:
+            await asyncio.sleep(sample_latency(config))
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(config["stream_chunk_ms"] / 1000)
+                yield f"data: {json.dumps(gemini_body(chunk, 'STOP' if i == len(chunks) - 1 else None))}\r\n\r\n"
+            stats["gemini.stream"] += 1
+        finally:
+            in_flight["gemini"] -= 1
+
+    in_flight["gemini"] += 1
+    streaming = False
+    try:
+        text = gemini_text(prompt_text(await request.json()))
+        if action == "streamGenerateContent":
+            streaming = True
+            return StreamingResponse(events(text), media_type="text/event-stream")
+
+        await asyncio.sleep(sample_latency(config))
+        error = server_error("gemini", config)
+        if error:
+            return error
+        stats["gemini.200"] += 1
+        return gemini_body(text)
+    finally:
+        if not streaming:
+            in_flight["gemini"] -= 1
+
+
+@app.post("/models/{model_id:path}")
+async def huggingface_inference(model_id: str, request: Request):
+    config = settings_for("medgemma")
+    stats["medgemma.requests"] += 1
+    rejected = failure("medgemma", config)
+    if rejected:
+        return rejected
+
+    in_flight["medgemma"] += 1
+    try:
+        body = await request.json()
+        image = (body.get("inputs") or {}).get("image", "")
+        await asyncio.sleep(sample_latency(config))
+        error = server_error("medgemma", config)
+        if error:
+            return error
+        stats["medgemma.200"] += 1
+        return [{"generated_text": (
+            "Assistive, non-diagnostic analysis (stub):\n"
+            f"Image received ({len(image) * 3 // 4 // 1024} KiB).\n"
+            "Observations:\n- Anatomical structures visualized\n- No acute abnormality flagged by the stub model\n"
+            "Recommendation: Clinical correlation required."
+        )}]
+    finally:
+        in_flight["medgemma"] -= 1
+
+
+@app.get("/_stub/config")
+async def get_config():
+    return {"settings": SETTINGS, "overrides": OVERRIDES}
+
+
+@app.post("/_stub/config")
+async def update_config(request: Request):
+    changes = await request.json()
+    target = changes.pop("target", None)
+    unknown = [key for key in changes if key not in SETTINGS]
+    if unknown or (target and target not in TARGETS) or changes.get("jitter", "fixed") not in JITTER_MODES:
+        return JSONResponse({"error": f"invalid settings: {unknown or target or changes.get('jitter')}"}, status_code=400)
+    changes = {key: type(SETTINGS[key])(value) for key, value in changes.items()}
+    if target:
+        OVERRIDES[target].update(changes)
+    else:
+        SETTINGS.update(changes)
+    return await get_config()
+
+
+@app.get("/_stub/stats")
+async def get_stats():
+    return {"counts": dict(stats), "in_flight": dict(in_flight)}
+
+
+@app.post("/_stub/reset")
+async def reset_stats():
+    stats.clear()
+    return {"status": "reset"}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("STUB_MODEL_PORT", "8090")))
+    parser.add_argument("--latency-ms", type=float, default=SETTINGS["latency_ms"], help="mean response latency")
+    parser.add_argument("--jitter", choices=JITTER_MODES, default=SETTINGS["jitter"], help="latency distribution")
+    parser.add_argument("--spread", type=float, default=SETTINGS["spread"], help="uniform +/- fraction, or lognormal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500/503")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="429 once this many requests are in flight")
+    parser.add_argument("--stream-chunks", type=int, default=SETTINGS["stream_chunks"])
+    parser.add_argument("--stream-chunk-ms", type=float, default=SETTINGS["stream_chunk_ms"])
+    parser.add_argument("--seed", type=int, help="fix the random sequence for repeatable runs")
+    args = parser.parse_args()
+
+    SETTINGS.update({
+        "latency_ms": args.latency_ms,
+        "jitter": args.jitter,
+        "spread": args.spread,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+        "max_concurrency": args.max_concurrency,
+        "stream_chunks": args.stream_chunks,
+        "stream_chunk_ms": args.stream_chunk_ms,
+    })
+    if args.seed is not None:
+        _rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hmac
+import uuid
+import base64
+import hashlib
+import secrets
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+
+# Tokens are HS256 JWTs signed with this secret. Every worker must share it; without
+# one each process signs with its own random key and tokens only validate there.
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET", "")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(12 * 3600)))
+
+if not AUTH_TOKEN_SECRET:
+    print("Warning: AUTH_TOKEN_SECRET is not set; issued tokens are only valid in this process.")
+    AUTH_TOKEN_SECRET = secrets.token_urlsafe(32)
+
+_SECRET = AUTH_TOKEN_SECRET.encode("utf-8")
+_HEADER = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode()).rstrip(b"=")
+
+# jti -> exp of logged-out tokens; entries drop out once the token would have expired anyway
+_revoked: Dict[str, int] = {}
+_revoked_lock = threading.Lock()
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64encode(hmac.new(_SECRET, signing_input, hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, role: str, patient_id: Optional[str] = None, ttl_seconds: Optional[int] = None) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": user_id,
+        "role": role,
+        "patient_id": patient_id,
+        "iat": now,
+        "exp": now + (ttl_seconds or AUTH_TOKEN_TTL_SECONDS),
+        "jti": uuid.uuid4().hex,
+    }
+    signing_input = _HEADER + b"." + _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return (signing_input + b"." + _sign(signing_input)).decode("ascii")
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    # Pure CPU: one HMAC and a dict lookup, no database access.
+    try:
+        raw = token.encode("ascii")
+        header, payload, signature = raw.split(b".")
+    except (UnicodeEncodeError, ValueError):
+        raise InvalidTokenError("Malformed token")
+
+    if header != _HEADER:
+        raise InvalidTokenError("Unsupported token header")
+    if not hmac.compare_digest(signature, _sign(header + b"." + payload)):
+        raise InvalidTokenError("Invalid token signature")
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidTokenError("Malformed token payload")
+
+    if claims.get("exp", 0) <= time.time():
+        raise InvalidTokenError("Token expired")
+    if claims.get("jti") in _revoked:
+        raise InvalidTokenError("Token revoked")
+    return claims
+
+
+def revoke_token(claims: Dict[str, Any]):
+    now = time.time()
+    with _revoked_lock:
+        _revoked[claims["jti"]] = claims["exp"]
+        for jti in [jti for jti, exp in _revoked.items() if exp <= now]:
+            del _revoked[jti]
+
+
+class AuthMiddleware:
+    # Plain ASGI middleware that verifies the bearer token and stores its claims in
+    # request.state.auth (None when there is no valid token). With `required`, requests
+    # outside the public paths and /admin/ (which has its own token) need a valid one.
+    # On public paths a bad token is ignored, so a client holding an expired token can
+    # still log in again.
+
+    def __init__(self, app, required: bool = False, public_paths: Iterable[str] = ()):
+        self.app = app
+        self.required = required
+        self.public_paths = frozenset(public_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        claims = error = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if value[:7].lower() == b"bearer ":
+                    try:
+                        claims = verify_token(value[7:].strip().decode("latin-1"))
+                    except InvalidTokenError as e:
+                        error = str(e)
+                break
+        scope.setdefault("state", {})["auth"] = claims
+
+        path = scope["path"]
+        protected = path not in self.public_paths and not path.startswith("/admin/") and scope["method"] != "OPTIONS"
+        if protected and (error or (claims is None and self.required)):
+            response = JSONResponse(status_code=401, content={"detail": error or "Not authenticated"},
+                                    headers={"WWW-Authenticate": "Bearer"})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,131 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Strength and formulation noise that prescriptions and OCR add around a drug name,
+# e.g. "Metformin 500mg tab" or "Amoxicillin 250 mg/5 ml susp".
+_DOSE_RE = re.compile(r"\d+(?:[.,]\d+)?\s*(?:mg|mcg|µg|ug|g|gm|ml|l|iu|units?|%)(?:\s*/\s*\d*(?:[.,]\d+)?\s*(?:ml|l|g|dose|tab))?\b")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_FORM_WORDS = {
+    "tab", "tabs", "tablet", "tablets", "cap", "caps", "capsule", "capsules",
+    "syp", "syrup", "susp", "suspension", "inj", "injection", "oral", "drops",
+    "cream", "ointment", "gel", "sr", "er", "xr", "xl", "cr", "dr", "mr",
+    "od", "bd", "bid", "tds", "tid", "qid", "hs", "sos", "prn", "daily",
+}
+
+
+def normalize_drug_name(name: str) -> str:
+    text = _DOSE_RE.sub(" ", name.lower())
+    text = _NON_ALNUM_RE.sub(" ", text)
+    return " ".join(word for word in text.split() if word not in _FORM_WORDS and not word.isdigit())
+
+
+def fold_prefix(text: str) -> str:
+    # Case, punctuation and whitespace folding only: unlike normalize_drug_name it keeps
+    # form words and digits, so a partly typed "tab" or "cap" still matches names.
+    return " ".join(_NON_ALNUM_RE.sub(" ", text.lower()).split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DrugNameMatcher:
+    # Character-trigram index over every synonym. A query counts shared trigrams with all
+    # names in one vectorised pass (bincount over the query's posting lists) and ranks
+    # them by Dice similarity.
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        self._names: List[str] = []
+        # Name as spelled in the dataset, for display in suggestions
+        self._display_names: List[str] = []
+        self._drug_ids: List[str] = []
+        self._by_name: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = {}
+        gram_counts = []
+
+        for name, drug_id in entries:
+            normalized = normalize_drug_name(name)
+            if not normalized or normalized in self._by_name:
+                continue
+            name_id = len(self._names)
+            self._by_name[normalized] = name_id
+            self._names.append(normalized)
+            self._display_names.append(name.strip())
+            self._drug_ids.append(drug_id)
+            grams = trigrams(normalized)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(name_id)
+
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._gram_counts = np.array(gram_counts, dtype=np.float32)
+
+        # Prefix index for autocomplete over case-folded names (form words kept), in sorted
+        # order, so every completion of a prefix is one contiguous slice found with two bisects.
+        folded = [fold_prefix(name) for name in self._display_names]
+        order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._sorted_names = [folded[i] for i in order]
+        self._sorted_ids = np.array(order, dtype=np.int32)
+        self._sorted_lengths = np.array([len(folded[i]) for i in order], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def exact(self, name: str) -> Optional[Tuple[str, str]]:
+        name_id = self._by_name.get(normalize_drug_name(name))
+        if name_id is None:
+            return None
+        return self._names[name_id], self._drug_ids[name_id]
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+        # Returns (matched_name, drug_id, score) with score in [0, 1], best first.
+        grams = trigrams(normalize_drug_name(query))
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists or not self._names:
+            return []
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._names))
+        scores = 2.0 * shared / (len(grams) + self._gram_counts)
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (self._names[i], self._drug_ids[i], round(float(scores[i]), 3))
+            for i in top if scores[i] > 0 and scores[i] >= min_score
+        ]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        # Returns (display name, drug_id) for names starting with prefix, shortest first so
+        # the exact name and the closest completions lead, with one entry per drug.
+        prefix = fold_prefix(prefix)
+        if not prefix:
+            return []
+        lo = bisect_left(self._sorted_names, prefix)
+        hi = bisect_left(self._sorted_names, prefix + "\uffff", lo)
+        if lo == hi:
+            return []
+
+        # Rank by (length, alphabetical); a short prefix can match thousands of names, so
+        # only the best few are sorted. Extra rows leave room for synonyms of one drug.
+        keys = self._sorted_lengths[lo:hi] * (hi - lo) + np.arange(hi - lo)
+        take = min(limit * 4, hi - lo)
+        top = np.argpartition(keys, take - 1)[:take]
+        top = top[np.argsort(keys[top])]
+
+        results = []
+        seen = set()
+        for offset in top:
+            name_id = self._sorted_ids[lo + offset]
+            drug_id = self._drug_ids[name_id]
+            if drug_id in seen:
+                continue
+            seen.add(drug_id)
+            results.append((self._display_names[name_id], drug_id))
+            if len(results) == limit:
+                break
+        return results
@@ -0,0 +1,181 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from services.metrics import Histogram, EXECUTOR_TASK_SECONDS, register_collector
+from services.tracing import span
+
+# bcrypt releases the GIL while hashing, so threads give real parallelism for it.
+CPU_THREAD_WORKERS = int(os.getenv("CPU_THREAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# PIL decoding and PyPDF2 parsing hold the GIL, so they run in separate processes.
+# 0 runs them on the thread pool instead.
+CPU_PROCESS_WORKERS = int(os.getenv("CPU_PROCESS_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# Never plain fork: by the time the pool starts, the import warm-up, dataset watcher and
+# job threads are running, and a forked child can inherit one of their held locks and hang.
+PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+# A process task running longer than this is treated as stuck and its pool replaced.
+PROCESS_TASK_TIMEOUT_SECONDS = float(os.getenv("PROCESS_TASK_TIMEOUT_SECONDS", "60"))
+
+_lock = threading.Lock()
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+class _PoolStats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def snapshot(self, workers: int) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "workers": workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.submitted - finished,
+            "queue_wait_avg_ms": round(self.wait_seconds_total / finished * 1000, 3) if finished else 0.0,
+            "queue_wait_max_ms": round(self.wait_seconds_max * 1000, 3),
+            "run_avg_ms": round(self.run_seconds_total / finished * 1000, 3) if finished else 0.0,
+        }
+
+
+_stats = {"thread": _PoolStats(), "process": _PoolStats()}
+
+
+class ExecutorUnavailableError(Exception):
+    # The process pool broke or a task timed out; the request can be retried.
+    pass
+
+EXECUTOR_QUEUE_WAIT_SECONDS = Histogram("arogya_executor_queue_wait_seconds", "Time CPU tasks wait for a free worker.", ("pool",))
+
+
+def _timed(fn: Callable, *args) -> tuple:
+    # Runs in the worker; wall-clock stamps are comparable across processes.
+    started = time.time()
+    try:
+        return started, fn(*args), None, time.time()
+    except Exception as e:
+        return started, None, e, time.time()
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=CPU_THREAD_WORKERS, thread_name_prefix="cpu")
+        return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    # Created on first use, so gunicorn workers each start their own pool after preload.
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=CPU_PROCESS_WORKERS,
+                                                mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+        return _process_pool
+
+
+async def _run(kind: str, executor: Executor, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+    task = getattr(fn, "__name__", "task")
+    # The span is opened on the event loop, so work in a pool process (PDF parsing,
+    # image decoding) still appears in the request's trace under the function's name.
+    with span(task, **{"executor.pool": kind}) as task_span:
+        stats = _stats[kind]
+        stats.submitted += 1
+        submitted = time.time()
+        try:
+            started, result, error, finished = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(executor, _timed, fn, *args), timeout)
+        except BaseException:
+            stats.failed += 1
+            raise
+
+        wait = max(0.0, started - submitted)
+        EXECUTOR_QUEUE_WAIT_SECONDS.labels(kind).observe(wait)
+        # Per-function run time, e.g. task="extract_text_from_pdf" for PDF parsing
+        EXECUTOR_TASK_SECONDS.labels(kind, task).observe(finished - started)
+        task_span.set_attribute("executor.queue_wait_ms", round(wait * 1000, 3))
+        task_span.set_attribute("executor.run_ms", round((finished - started) * 1000, 3))
+        stats.wait_seconds_total += wait
+        stats.wait_seconds_max = max(stats.wait_seconds_max, wait)
+        stats.run_seconds_total += finished - started
+        if error is not None:
+            stats.failed += 1
+            raise error
+        stats.completed += 1
+        return result
+
+
+async def run_in_thread(fn: Callable, *args) -> Any:
+    return await _run("thread", _get_thread_pool(), fn, *args)
+
+
+async def run_in_process(fn: Callable, *args) -> Any:
+    # fn and args must be picklable: module-level functions with plain arguments.
+    if CPU_PROCESS_WORKERS <= 0:
+        return await _run("thread", _get_thread_pool(), fn, *args)
+    pool = _get_process_pool()
+    try:
+        return await _run("process", pool, fn, *args, timeout=PROCESS_TASK_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool for later calls.
+        _retire_process_pool(pool)
+        raise ExecutorUnavailableError(f"{getattr(fn, '__name__', 'task')} failed: a worker process died")
+    except asyncio.TimeoutError:
+        # The worker cannot be interrupted; replace the pool so it stops holding a slot.
+        _retire_process_pool(pool)
+        raise ExecutorUnavailableError(f"{getattr(fn, '__name__', 'task')} did not finish within "
+                                       f"{PROCESS_TASK_TIMEOUT_SECONDS:g} s")
+
+
+def _retire_process_pool(pool: ProcessPoolExecutor):
+    global _process_pool
+    with _lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    # ProcessPoolExecutor has no public way to stop busy workers before Python 3.14
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "thread": _stats["thread"].snapshot(CPU_THREAD_WORKERS),
+        "process": _stats["process"].snapshot(CPU_PROCESS_WORKERS),
+    }
+
+
+def _collect_executor_metrics():
+    samples = []
+    for kind, stats in executor_stats().items():
+        samples.append(("arogya_executor_workers", "gauge", "Configured CPU executor workers.", {"pool": kind}, stats["workers"]))
+        samples.append(("arogya_executor_tasks_in_flight", "gauge", "CPU tasks queued or running.", {"pool": kind}, stats["in_flight"]))
+    return samples
+
+
+register_collector(_collect_executor_metrics)
+
+
+def shutdown_executors():
+    global _thread_pool, _process_pool
+    with _lock:
+        for pool in (_thread_pool, _process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+        _process_pool = None
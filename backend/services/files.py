@@ -1,15 +1,40 @@
+import io
 import os
+import glob
+import time
 import uuid
+import hashlib
+import tempfile
 import aiofiles
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile
 
-STORAGE_BASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage")
+from services.tracing import traced, current_span
+
+STORAGE_BASE = os.getenv("STORAGE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage")
 DOCUMENTS_DIR = os.path.join(STORAGE_BASE, "documents")
 IMAGES_DIR = os.path.join(STORAGE_BASE, "images")
+PREPROCESSED_DIR = os.path.join(STORAGE_BASE, "cache", "preprocessed")
+# Large transient uploads spill here; kept under storage so the startup sweep can find them
+TEMP_DIR = os.path.join(STORAGE_BASE, "tmp")
 
 os.makedirs(DOCUMENTS_DIR, exist_ok=True)
 os.makedirs(IMAGES_DIR, exist_ok=True)
+os.makedirs(PREPROCESSED_DIR, exist_ok=True)
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+# Transient uploads stay in memory up to this size and roll over to a named temp file above it.
+SCAN_SPOOL_MAX_BYTES = int(float(os.getenv("SCAN_SPOOL_MAX_MB", "8")) * 1024 * 1024)
+SPOOL_CHUNK_SIZE = 1024 * 1024
+# Spool files older than this are left over from a crash; younger ones may belong to a
+# request still running in another worker process.
+TEMP_SCAN_MAX_AGE_MINUTES = float(os.getenv("TEMP_SCAN_MAX_AGE_MINUTES", "60"))
+
+# Bounds for storage/cache/preprocessed; least recently used files go first.
+PREPROCESSED_CACHE_MAX_MB = float(os.getenv("PREPROCESSED_CACHE_MAX_MB", "512"))
+PREPROCESSED_CACHE_MAX_AGE_DAYS = float(os.getenv("PREPROCESSED_CACHE_MAX_AGE_DAYS", "30"))
 
+@traced("files.save_document")
 async def save_document(file: UploadFile, doc_id: str) -> str:
     ext = os.path.splitext(file.filename)[1] if file.filename else ""
     filename = f"{doc_id}{ext}"
@@ -18,9 +43,11 @@ async def save_document(file: UploadFile, doc_id: str) -> str:
     async with aiofiles.open(filepath, "wb") as f:
         content = await file.read()
         await f.write(content)
+    current_span().set_attribute("file.bytes", len(content))
     
     return filepath
 
+@traced("files.save_image")
 async def save_image(file: UploadFile, img_id: str) -> str:
     ext = os.path.splitext(file.filename)[1] if file.filename else ""
     filename = f"{img_id}{ext}"
@@ -29,6 +56,7 @@ async def save_image(file: UploadFile, img_id: str) -> str:
     async with aiofiles.open(filepath, "wb") as f:
         content = await file.read()
         await f.write(content)
+    current_span().set_attribute("file.bytes", len(content))
     
     return filepath
 
@@ -37,3 +65,90 @@ def get_document_path(storage_path: str) -> str:
 
 def get_image_path(storage_path: str) -> str:
     return storage_path
+
+@traced("files.spool_upload")
+async def spool_upload(file: UploadFile) -> Tuple[BinaryIO, str]:
+    # Copies the upload into a buffer and hashes it in the same pass. Small uploads stay in
+    # memory; larger ones go to a named temp file so worker processes can open it by path
+    # (see spooled_path) instead of receiving the bytes. The caller owns the returned
+    # buffer and must close it; closing removes the temp file.
+    spool = io.BytesIO()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size + len(chunk) > SCAN_SPOOL_MAX_BYTES and isinstance(spool, io.BytesIO):
+                on_disk = tempfile.NamedTemporaryFile(prefix="temp_scan_", dir=TEMP_DIR)
+                on_disk.write(spool.getbuffer())
+                spool = on_disk
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    current_span().set_attribute("file.bytes", size)
+    current_span().set_attribute("file.spooled_to_disk", not isinstance(spool, io.BytesIO))
+    return spool, digest.hexdigest()
+
+def spooled_path(spool: BinaryIO) -> Optional[str]:
+    # Path of a spool that rolled over to disk; None while it is still in memory.
+    name = getattr(spool, "name", None)
+    return name if isinstance(name, str) else None
+
+def sweep_temp_scans() -> int:
+    # Removes spool files a crashed or killed worker left in TEMP_DIR, plus the transient
+    # scans older releases wrote into IMAGES_DIR.
+    max_age_cutoff = time.time() - TEMP_SCAN_MAX_AGE_MINUTES * 60
+    leftovers = [path for path in glob.glob(os.path.join(TEMP_DIR, "temp_scan_*"))
+                 if _mtime(path) < max_age_cutoff]
+    leftovers += glob.glob(os.path.join(IMAGES_DIR, "temp_scan_*"))
+    removed = 0
+    for path in leftovers:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"Could not remove leftover scan {path}: {e}")
+    return removed
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        # Already gone; never counts as old
+        return time.time()
+
+def sweep_preprocessed_cache() -> int:
+    # Removes entries older than the age limit, then the least recently used ones until the
+    # directory fits the size limit. Cache hits refresh mtime, so mtime order is LRU order.
+    entries = []
+    for entry in os.scandir(PREPROCESSED_DIR):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if entry.is_file():
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+
+    max_age_cutoff = time.time() - PREPROCESSED_CACHE_MAX_AGE_DAYS * 86400
+    excess = sum(size for _, size, _ in entries) - PREPROCESSED_CACHE_MAX_MB * 1024 * 1024
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= max_age_cutoff and excess <= 0:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # Another worker got there first
+            continue
+        excess -= size
+        removed += 1
+    return removed
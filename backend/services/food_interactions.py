@@ -0,0 +1,71 @@
+import os
+import re
+import csv
+import json
+from typing import Dict, List, Optional, Tuple
+
+from services.interaction_store import dataset_version
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_food_name(name: str) -> str:
+    # "Grapefruits", "grapefruit-juice " -> "grapefruit", "grapefruit juice"
+    words = _NON_ALNUM_RE.sub(" ", name.lower()).split()
+    return " ".join(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words)
+
+
+class FoodInteractionTable:
+    # Drug-food interactions keyed by (drug_id, food_key). Food names are folded onto a
+    # canonical key through food_synonyms.json, so "grapefruit juice" and "pomelo" hit the
+    # same rows as "grapefruit". The table is small (one row per documented drug-food
+    # pair), so a dict keeps each lookup O(1) next to the drug-drug pair index.
+
+    def __init__(
+            self,
+            records: List[Tuple[str, str, str, Optional[str]]] = (),
+            synonyms: Optional[Dict[str, List[str]]] = None,
+            dataset_version: str = ""):
+        self._food_keys: Dict[str, str] = {}
+        self._rows: Dict[Tuple[str, str], List[Tuple[str, Optional[str]]]] = {}
+        self.dataset_version = dataset_version
+
+        for food_key, names in (synonyms or {}).items():
+            key = normalize_food_name(food_key)
+            self._food_keys[key] = key
+            for name in names:
+                if name:
+                    self._food_keys[normalize_food_name(name)] = key
+
+        for drug_id, food, description, severity in records:
+            food_key = self.resolve_food(food) or normalize_food_name(food)
+            self._food_keys.setdefault(food_key, food_key)
+            self._rows.setdefault((drug_id, food_key), []).append((description, severity))
+
+    @classmethod
+    def from_files(cls, csv_path: str, synonyms_path: str) -> "FoodInteractionTable":
+        # Columns: Drug (DrugBank id, optionally "Compound::"-prefixed), Food, Interaction, Severity
+        synonyms = {}
+        if os.path.exists(synonyms_path):
+            with open(synonyms_path, "r", encoding="utf-8") as f:
+                synonyms = json.load(f)
+
+        records = []
+        if os.path.exists(csv_path):
+            with open(csv_path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    drug_id = (row.get("Drug") or "").replace("Compound::", "")
+                    food = row.get("Food") or ""
+                    if drug_id and food:
+                        records.append((drug_id, food, row.get("Interaction") or "", row.get("Severity") or None))
+
+        return cls(records, synonyms, dataset_version(csv_path, synonyms_path) if records else "")
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    def resolve_food(self, name: str) -> Optional[str]:
+        return self._food_keys.get(normalize_food_name(name))
+
+    def lookup(self, drug_id: str, food_key: str) -> List[Tuple[str, Optional[str]]]:
+        return self._rows.get((drug_id, food_key), [])
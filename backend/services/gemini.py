@@ -1,20 +1,141 @@
 import os
-import google.generativeai as genai
-from typing import List, Tuple
-from PyPDF2 import PdfReader
+import io
+import json
+import base64
+from typing import Any, Iterator, List, Optional, Tuple
+
+from services.metrics import model_call
+from services.tracing import traced, current_span
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Default to a model that exists. The user list showed gemini-2.5-flash and gemini-3-flash-preview.
 # gemini-3-flash might be invalid alias.
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# "google" uses the google-generativeai SDK; "http" speaks the Gemini REST API to
+# GEMINI_BASE_URL, e.g. the local stub in scripts/stub_model_server.py.
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "").rstrip("/")
+GEMINI_PROVIDER = os.getenv("GEMINI_PROVIDER") or ("http" if GEMINI_BASE_URL else "google")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+
+
+def load_genai():
+    # google.generativeai takes most of the app's import time, so it is imported on
+    # first use (or by the startup warm-up in services.warmup) rather than at module load.
+    import google.generativeai as genai
+    return genai
+
+
+class ModelProviderError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ModelRateLimitError(ModelProviderError):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message, 429)
+        self.retry_after = retry_after
+
+
+class _TextResponse:
+    # The one attribute callers read from genai's GenerateContentResponse
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _content_parts(contents) -> List[dict]:
+    parts = []
+    for part in contents if isinstance(contents, (list, tuple)) else [contents]:
+        if isinstance(part, str):
+            parts.append({"text": part})
+        elif isinstance(part, dict) and "data" in part:
+            data = part["data"]
+            parts.append({"inline_data": {
+                "mime_type": part.get("mime_type", "application/octet-stream"),
+                "data": base64.b64encode(data).decode("ascii") if isinstance(data, bytes) else data
+            }})
+        elif hasattr(part, "save"):
+            # PIL image
+            out = io.BytesIO()
+            part.convert("RGB").save(out, "JPEG", quality=90)
+            parts.append({"inline_data": {"mime_type": "image/jpeg", "data": base64.b64encode(out.getvalue()).decode("ascii")}})
+        else:
+            parts.append({"text": str(part)})
+    return parts
+
+
+def _response_text(body: dict) -> str:
+    candidates = body.get("candidates") or []
+    if not candidates:
+        raise ModelProviderError(f"No candidates in response: {str(body)[:200]}")
+    return "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+
+
+class HttpGeminiModel:
+    # Same generate_content() surface as genai.GenerativeModel, over the REST API.
+
+    def __init__(self, model_name: str, base_url: str = GEMINI_BASE_URL, api_key: Optional[str] = GEMINI_API_KEY,
+                 timeout: float = GEMINI_TIMEOUT_SECONDS):
+        self.model_name = model_name
+        self.base_url = base_url
+        self.api_key = api_key or ""
+        self.timeout = timeout
+
+    def _raise_for_status(self, response):
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            raise ModelRateLimitError(f"Gemini rate limited: {response.text[:200]}",
+                                      float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None)
+        if response.status_code != 200:
+            raise ModelProviderError(f"Gemini error {response.status_code}: {response.text[:200]}", response.status_code)
+
+    def generate_content(self, contents, stream: bool = False):
+        import httpx
+
+        body = {"contents": [{"role": "user", "parts": _content_parts(contents)}]}
+        headers = {"x-goog-api-key": self.api_key}
+        if stream:
+            return self._stream(body, headers)
+        response = httpx.post(f"{self.base_url}/v1beta/models/{self.model_name}:generateContent",
+                              json=body, headers=headers, timeout=self.timeout)
+        self._raise_for_status(response)
+        return _TextResponse(_response_text(response.json()))
+
+    def _stream(self, body: dict, headers: dict) -> Iterator[_TextResponse]:
+        # Server-sent events, one partial GenerateContentResponse per "data:" line
+        import httpx
+
+        url = f"{self.base_url}/v1beta/models/{self.model_name}:streamGenerateContent?alt=sse"
+        with httpx.stream("POST", url, json=body, headers=headers, timeout=self.timeout) as response:
+            if response.status_code != 200:
+                response.read()
+                self._raise_for_status(response)
+            for line in response.iter_lines():
+                if line.startswith("data:"):
+                    yield _TextResponse(_response_text(json.loads(line[5:])))
 
 
 def configure_gemini():
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
+    if GEMINI_API_KEY and GEMINI_PROVIDER == "google":
+        load_genai().configure(api_key=GEMINI_API_KEY)
+
+
+def get_gemini_model(model_name: Optional[str] = None, api_key: Optional[str] = None) -> Any:
+    # Returns an object with generate_content(contents, stream=False) for the configured provider
+    if GEMINI_PROVIDER == "http":
+        return HttpGeminiModel(model_name or GEMINI_MODEL, api_key=api_key or GEMINI_API_KEY)
+    genai = load_genai()
+    if api_key:
+        genai.configure(api_key=api_key)
+    else:
+        configure_gemini()
+    return genai.GenerativeModel(model_name or GEMINI_MODEL)
 
 
+# Usually run through run_in_process, whose span (named after the function) times it
 def extract_text_from_pdf(filepath: str) -> str:
+    from PyPDF2 import PdfReader
+
     try:
         reader = PdfReader(filepath)
         text = ""
@@ -25,8 +146,9 @@ def extract_text_from_pdf(filepath: str) -> str:
         return f"[Error extracting text: {str(e)}]"
 
 def extract_text_from_pdf_bytes(content: bytes) -> str:
+    from PyPDF2 import PdfReader
+
     try:
-        import io
         reader = PdfReader(io.BytesIO(content))
         text = ""
         for page in reader.pages:
@@ -36,8 +158,10 @@ def extract_text_from_pdf_bytes(content: bytes) -> str:
         return f"[Error extracting text: {str(e)}]"
 
 
+@traced("gemini.generate_summary")
 async def generate_summary(documents_text: List[Tuple[str, str]]) -> List[str]:
     configure_gemini()
+    current_span().set_attribute("documents.count", len(documents_text))
 
     if not GEMINI_API_KEY:
         return [
@@ -67,8 +191,9 @@ Documents:
 
 Respond with exactly 5 bullet points, one per line, starting each with "- ":"""
 
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        response = model.generate_content(prompt)
+        model = get_gemini_model()
+        with model_call("gemini", "summary"):
+            response = model.generate_content(prompt)
 
         bullets = []
         for line in response.text.strip().split("\n"):
@@ -95,10 +220,12 @@ Respond with exactly 5 bullet points, one per line, starting each with "- ":"""
         ]
 
 
+@traced("gemini.grounded_qa")
 async def grounded_qa(
         question: str,
         documents_text: List[Tuple[str, str]]) -> Tuple[str, List[dict]]:
     configure_gemini()
+    current_span().set_attribute("documents.count", len(documents_text))
     
     print(f"DEBUG: GEMINI_API_KEY present: {bool(GEMINI_API_KEY)}")
     print(f"DEBUG: GEMINI_MODEL: {GEMINI_MODEL}")
@@ -133,8 +260,9 @@ Respond in this format:
 Answer: [your answer in the language of the question]
 Sources: [list document names, or "General Knowledge"]"""
 
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        response = model.generate_content(prompt)
+        model = get_gemini_model()
+        with model_call("gemini", "qa"):
+            response = model.generate_content(prompt)
 
         text = response.text.strip()
 
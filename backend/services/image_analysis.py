@@ -0,0 +1,84 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, Tuple, List, AsyncIterator
+
+from services.medgemma import analyze_medical_image, get_provider, get_model, PROMPT_VERSION
+from services.result_cache import get_cached, put_cached, hash_file
+from services.preprocess import preprocessing_signature
+from services.executor import run_in_thread
+
+CACHE_NAMESPACE = "image_analysis"
+IMAGE_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_ANALYSIS_CACHE_MAX_ENTRIES", "2000"))
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "4"))
+# The model sees the preprocessed image, so preprocessing settings are part of the cache identity.
+ANALYSIS_VERSION = f"{PROMPT_VERSION}:{preprocessing_signature()}"
+
+
+async def get_cached_image_analysis(storage_path: str) -> Optional[str]:
+    # Hashing reads the whole file, so it runs on the thread pool. Raises
+    # FileNotFoundError when the stored image is gone.
+    content_hash = await run_in_thread(hash_file, storage_path)
+    return get_cached(CACHE_NAMESPACE, content_hash, get_provider(), get_model(), ANALYSIS_VERSION)
+
+
+async def run_image_analysis(storage_path: str, refresh: bool = False) -> Tuple[Optional[str], bool]:
+    # Returns (result, cached). result is None when the provider failed.
+    content_hash = await run_in_thread(hash_file, storage_path)
+    provider = get_provider()
+    model = get_model()
+
+    if not refresh:
+        cached = get_cached(CACHE_NAMESPACE, content_hash, provider, model, ANALYSIS_VERSION)
+        if cached is not None:
+            return cached, True
+
+    result = await analyze_medical_image(storage_path, content_hash)
+
+    # Template output is free to regenerate, so only real model results are kept.
+    if result is not None and provider != "mock":
+        put_cached(
+            CACHE_NAMESPACE, content_hash, provider, model, ANALYSIS_VERSION, result,
+            max_entries=IMAGE_ANALYSIS_CACHE_MAX_ENTRIES
+        )
+
+    return result, False
+
+
+async def analyze_images_batch(
+        images: List[dict],
+        concurrency: int = BATCH_ANALYSIS_CONCURRENCY) -> AsyncIterator[Tuple[dict, Optional[str], bool, Optional[str]]]:
+    # Yields (image, result, cached, error) in completion order; at most `concurrency`
+    # provider calls are in flight at once.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze_one(image: dict):
+        async with semaphore:
+            try:
+                result, cached = await run_image_analysis(image["storage_path"])
+            except Exception as e:
+                return image, None, False, str(e)[:200]
+        return image, result, cached, None if result is not None else "Image analysis provider failed"
+
+    tasks = [asyncio.create_task(analyze_one(image)) for image in images]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def save_image_analysis(cursor, image_id: str, result: str) -> str:
+    analysis_id = f"ana_{uuid.uuid4().hex[:12]}"
+    created_at = datetime.now(timezone.utc).isoformat()
+
+    # One analysis per image; re-analysis replaces the previous row.
+    cursor.execute("DELETE FROM image_analysis WHERE image_id = ?", (image_id,))
+    cursor.execute(
+        "INSERT INTO image_analysis (id, image_id, result, created_at) VALUES (?, ?, ?, ?)",
+        (analysis_id, image_id, result, created_at)
+    )
+
+    return created_at
@@ -0,0 +1,354 @@
+import os
+import sys
+import csv
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent builds are not serialised
+    fcntl = None
+
+# Compiled, memory-mapped form of data_final_v5.csv + drugs_synonyms.json.
+#
+# Layout (native byte order, recorded in the header):
+#   MAGIC | u32 header length | JSON header | padding to 8 bytes | sections...
+# Section offsets in the header are relative to the first byte after the padding.
+#   strings_offsets  u64[n + 1]   byte offsets of every string in strings_data
+#   strings_data     utf-8 blob
+#   drug_ids         u32[drugs]   string index of each drug id; codes are assigned in sorted id order
+#   pair_keys        u64[rows]    pair_key(code_a, code_b), sorted
+#   pair_rows        u32[rows*4]  drug1 code, drug2 code, description string, adverse effects string
+#   names            u32[names]   string index of each lowercased synonym, sorted by name
+#   name_codes       u32[names]   drug code for each entry in names
+MAGIC = b"AROGYADI"
+FORMAT_VERSION = 1
+NO_STRING = 0xFFFFFFFF
+
+SECTIONS = [
+    ("strings_offsets", "Q"),
+    ("strings_data", "B"),
+    ("drug_ids", "I"),
+    ("pair_keys", "Q"),
+    ("pair_rows", "I"),
+    ("names", "I"),
+    ("name_codes", "I"),
+]
+
+
+class IndexFormatError(Exception):
+    pass
+
+
+def pair_key(code_a: int, code_b: int) -> int:
+    # Unordered pair of drug codes packed into one int, so (a, b) and (b, a) share a slot.
+    if code_a > code_b:
+        code_a, code_b = code_b, code_a
+    return (code_a << 32) | code_b
+
+
+def source_fingerprint(*paths: str) -> Dict[str, Optional[List[int]]]:
+    fingerprint = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            fingerprint[os.path.basename(path)] = None
+    return fingerprint
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self._index)
+            self._index[value] = idx
+            self._data += value.encode("utf-8")
+            self._offsets.append(len(self._data))
+        return idx
+
+
+def _read_records(csv_path: str) -> List[Tuple[str, str, str, Optional[str]]]:
+    records = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            drug1 = (row.get("Drug1") or "").replace("Compound::", "")
+            drug2 = (row.get("Drug2") or "").replace("Compound::", "")
+            # Self-interactions are never reported
+            if not drug1 or not drug2 or drug1 == drug2:
+                continue
+            records.append((drug1, drug2, row.get("Interaction") or "", row.get("Adverse Effects") or None))
+    return records
+
+
+def _read_synonyms(synonyms_path: str) -> Dict[str, str]:
+    name_to_id = {}
+    with open(synonyms_path, "r", encoding="utf-8") as f:
+        synonyms = json.load(f)
+    for drug_id, names in synonyms.items():
+        for name in names:
+            if name:
+                name_to_id[name.lower()] = drug_id
+    return name_to_id
+
+
+def dataset_version(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def build_index_file(csv_path: str, synonyms_path: str, out_path: str) -> dict:
+    if not os.path.exists(csv_path) and not os.path.exists(synonyms_path):
+        raise FileNotFoundError(f"Neither {csv_path} nor {synonyms_path} exists")
+
+    fingerprint = source_fingerprint(csv_path, synonyms_path)
+    records = _read_records(csv_path) if os.path.exists(csv_path) else []
+    name_to_id = _read_synonyms(synonyms_path) if os.path.exists(synonyms_path) else {}
+
+    drug_ids = sorted({drug for record in records for drug in record[:2]} | set(name_to_id.values()))
+    codes = {drug_id: code for code, drug_id in enumerate(drug_ids)}
+
+    strings = _StringTable()
+    drug_id_strings = array("I", (strings.add(drug_id) for drug_id in drug_ids))
+
+    rows = []
+    for drug1, drug2, description, adverse_effects in records:
+        code1, code2 = codes[drug1], codes[drug2]
+        rows.append((pair_key(code1, code2), code1, code2, strings.add(description), strings.add(adverse_effects)))
+    # Stable sort keeps dataset order within a pair
+    rows.sort(key=lambda row: row[0])
+
+    pair_keys = array("Q", (row[0] for row in rows))
+    pair_rows = array("I")
+    for _, code1, code2, description, adverse_effects in rows:
+        pair_rows.extend((code1, code2, description, adverse_effects))
+
+    sorted_names = sorted(name_to_id)
+    names = array("I", (strings.add(name) for name in sorted_names))
+    name_codes = array("I", (codes[name_to_id[name]] for name in sorted_names))
+
+    payloads = {
+        "strings_offsets": strings._offsets.tobytes(),
+        "strings_data": bytes(strings._data),
+        "drug_ids": drug_id_strings.tobytes(),
+        "pair_keys": pair_keys.tobytes(),
+        "pair_rows": pair_rows.tobytes(),
+        "names": names.tobytes(),
+        "name_codes": name_codes.tobytes(),
+    }
+
+    sections = {}
+    offset = 0
+    for name, _ in SECTIONS:
+        sections[name] = [offset, len(payloads[name])]
+        offset = _align(offset + len(payloads[name]))
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "sources": fingerprint,
+        "dataset_version": dataset_version(csv_path, synonyms_path),
+        "counts": {"drugs": len(drug_ids), "interactions": len(rows), "names": len(sorted_names)},
+        "sections": sections,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, _ in SECTIONS:
+            start, length = sections[name]
+            f.write(b"\0" * (data_start + start - f.tell()))
+            f.write(payloads[name])
+    # Readers that already mapped the old file keep their view; new readers see the new file.
+    os.replace(tmp_path, out_path)
+
+    return header
+
+
+class _StringColumn:
+    # Sequence view that decodes strings on access, so bisect can search the mapped
+    # tables without materialising them.
+
+    def __init__(self, index: "MappedInteractionIndex", string_ids):
+        self._index = index
+        self._string_ids = string_ids
+
+    def __len__(self) -> int:
+        return len(self._string_ids)
+
+    def __getitem__(self, i: int) -> str:
+        return self._index.string(self._string_ids[i])
+
+
+class MappedInteractionIndex:
+    # Same interface as services.interactions.InteractionIndex, backed by a mmap of the
+    # compiled file. Only the pages touched by a lookup are read from disk.
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise IndexFormatError(f"{path} is not an interaction index")
+        (header_len,) = struct.unpack_from("<I", buf, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buf[header_start:header_start + header_len]))
+
+        if self.header.get("format_version") != FORMAT_VERSION:
+            raise IndexFormatError(f"Unsupported index format {self.header.get('format_version')}")
+        if self.header.get("byteorder") != sys.byteorder:
+            raise IndexFormatError("Index was built on a machine with a different byte order")
+
+        self.path = path
+        data_start = _align(header_start + header_len)
+        for name, fmt in SECTIONS:
+            start, length = self.header["sections"][name]
+            view = buf[data_start + start:data_start + start + length]
+            setattr(self, f"_{name}", view if fmt == "B" else view.cast(fmt))
+
+        self._drug_column = _StringColumn(self, self._drug_ids)
+        # Zero-copy view of the sorted keys for batched searchsorted lookups
+        self._pair_key_array = np.frombuffer(self._pair_keys, dtype=np.uint64)
+        self._name_column = _StringColumn(self, self._names)
+
+    @property
+    def dataset_version(self) -> str:
+        return self.header["dataset_version"]
+
+    def __len__(self) -> int:
+        return len(self._pair_keys)
+
+    def string(self, idx: int) -> Optional[str]:
+        if idx == NO_STRING:
+            return None
+        return str(self._strings_data[self._strings_offsets[idx]:self._strings_offsets[idx + 1]], "utf-8")
+
+    def code(self, drug_id: str) -> Optional[int]:
+        i = bisect_left(self._drug_column, drug_id)
+        if i < len(self._drug_column) and self._drug_column[i] == drug_id:
+            return i
+        return None
+
+    def drug_id(self, code: int) -> str:
+        return self._drug_column[code]
+
+    def resolve(self, name: str) -> Optional[str]:
+        i = bisect_left(self._name_column, name)
+        if i < len(self._name_column) and self._name_column[i] == name:
+            return self.drug_id(self._name_codes[i])
+        return None
+
+    def names(self) -> Iterator[Tuple[str, str]]:
+        for i in range(len(self._name_column)):
+            yield self._name_column[i], self.drug_id(self._name_codes[i])
+
+    def lookup(self, code_a: int, code_b: int) -> List[Tuple[str, str, str, Optional[str]]]:
+        key = pair_key(code_a, code_b)
+        i = bisect_left(self._pair_keys, key)
+        found = []
+        while i < len(self._pair_keys) and self._pair_keys[i] == key:
+            code1, code2, description, adverse_effects = self._pair_rows[4 * i:4 * i + 4]
+            found.append((self.drug_id(code1), self.drug_id(code2), self.string(description), self.string(adverse_effects)))
+            i += 1
+        return found
+
+    def lookup_keys(self, keys: np.ndarray) -> Dict[int, List[Tuple[str, str, str, Optional[str]]]]:
+        # Rows for many pair keys at once: two searchsorted passes over the mapped keys,
+        # then rows are decoded only for the keys that actually have interactions.
+        lo = np.searchsorted(self._pair_key_array, keys, side="left")
+        hi = np.searchsorted(self._pair_key_array, keys, side="right")
+        found = {}
+        for i in np.flatnonzero(hi > lo):
+            rows = []
+            for row in range(lo[i], hi[i]):
+                code1, code2, description, adverse_effects = self._pair_rows[4 * row:4 * row + 4]
+                rows.append((self.drug_id(code1), self.drug_id(code2), self.string(description), self.string(adverse_effects)))
+            found[int(keys[i])] = rows
+        return found
+
+
+def is_stale(index: MappedInteractionIndex, csv_path: str, synonyms_path: str) -> bool:
+    current = source_fingerprint(csv_path, synonyms_path)
+    # A compiled file shipped without its sources is used as-is.
+    if all(value is None for value in current.values()):
+        return False
+    return index.header.get("sources") != current
+
+
+def _open_if_current(csv_path: str, synonyms_path: str, index_path: str) -> Optional[MappedInteractionIndex]:
+    if not os.path.exists(index_path):
+        return None
+    try:
+        index = MappedInteractionIndex(index_path)
+    except IndexFormatError as e:
+        print(f"Rebuilding interaction index: {e}")
+        return None
+    if is_stale(index, csv_path, synonyms_path):
+        print("Interaction sources changed since the index was built, rebuilding...")
+        return None
+    return index
+
+
+@contextmanager
+def _build_lock(index_path: str):
+    # Several workers starting together must not all rebuild the same file; the first
+    # one builds while the rest wait and then map its output.
+    if fcntl is None:
+        yield
+        return
+    with open(f"{index_path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_index(csv_path: str, synonyms_path: str, index_path: str) -> MappedInteractionIndex:
+    index = _open_if_current(csv_path, synonyms_path, index_path)
+    if index is not None:
+        return index
+
+    if not os.path.exists(csv_path) and not os.path.exists(synonyms_path):
+        raise FileNotFoundError(f"Neither {csv_path} nor {synonyms_path} exists")
+
+    with _build_lock(index_path):
+        index = _open_if_current(csv_path, synonyms_path, index_path)
+        if index is not None:
+            return index
+        build_index_file(csv_path, synonyms_path, index_path)
+
+    return MappedInteractionIndex(index_path)
@@ -1,113 +1,558 @@
 import os
+import sys
 import json
-import pandas as pd
-from typing import List, Dict, Any
+import time
+import asyncio
+import itertools
+import threading
+from functools import lru_cache
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # pandas is imported lazily at runtime; it is only needed to parse the CSV
+    import pandas as pd
+
+from services.interaction_store import pair_key, load_index, dataset_version, source_fingerprint
+from services.drug_names import DrugNameMatcher
+from services.food_interactions import FoodInteractionTable
+from services.metrics import timed, INTERACTION_CHECK_SECONDS
 
 # Correct paths based on workspace structure
-DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "dataset")
+DATASET_DIR = os.getenv("DATASET_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "dataset"))
 DRUG_SYNONYMS_PATH = os.path.join(DATASET_DIR, "drugs_synonyms.json")
 INTERACTIONS_PATH = os.path.join(DATASET_DIR, "data_final_v5.csv")
+# Optional drug-food table; see README for the layout
+FOOD_INTERACTIONS_PATH = os.path.join(DATASET_DIR, "drug_food_interactions.csv")
+FOOD_SYNONYMS_PATH = os.path.join(DATASET_DIR, "food_synonyms.json")
+# Compiled by scripts/build_interaction_index.py; rebuilt automatically when the sources change
+INTERACTION_INDEX_PATH = os.getenv("INTERACTION_INDEX_PATH", os.path.join(DATASET_DIR, "interactions.idx"))
+# Fuzzy matches scoring below this (Dice similarity of character trigrams) count as unresolved
+FUZZY_MATCH_MIN_SCORE = float(os.getenv("FUZZY_MATCH_MIN_SCORE", "0.6"))
+# Medication lists screened per vectorised pass by screen_medication_lists
+BATCH_SCREEN_CHUNK_SIZE = int(os.getenv("BATCH_SCREEN_CHUNK_SIZE", "500"))
+# How often the source files are checked for changes; 0 disables the watcher
+INTERACTIONS_WATCH_SECONDS = float(os.getenv("INTERACTIONS_WATCH_SECONDS", "30"))
+# How long a request waits for the background load before failing with 503
+INTERACTIONS_READY_TIMEOUT_SECONDS = float(os.getenv("INTERACTIONS_READY_TIMEOUT_SECONDS", "5"))
+# After a failed load, the next request this many seconds later starts a fresh attempt
+INTERACTIONS_RETRY_SECONDS = float(os.getenv("INTERACTIONS_RETRY_SECONDS", "30"))
+
+SOURCE_PATHS = (INTERACTIONS_PATH, DRUG_SYNONYMS_PATH, FOOD_INTERACTIONS_PATH, FOOD_SYNONYMS_PATH)
+
+_instance_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_warmup: Optional[Future] = None
+_warmup_failed_at = 0.0
+_reload_lock = threading.Lock()
+_watcher: Optional[asyncio.Task] = None
+
+
+class InteractionReloadError(Exception):
+    pass
+
+
+class ReloadInProgressError(InteractionReloadError):
+    pass
+
+
+class InteractionServiceUnavailableError(Exception):
+    # The dataset failed to load; a later request (or an admin reload) retries it.
+    pass
+
+
+class InteractionIndex:
+    # In-memory interaction rows keyed by unordered drug pair. Drug ids are interned and
+    # mapped to small integer codes so a check costs one dict lookup per requested pair
+    # instead of a scan over the whole dataset. Used when the compiled index
+    # (services.interaction_store.MappedInteractionIndex) cannot be built or mapped.
+
+    def __init__(
+            self,
+            records: Iterable[Tuple[str, str, str, Optional[str]]],
+            name_to_id: Optional[Dict[str, str]] = None,
+            dataset_version: str = ""):
+        self._codes: Dict[str, int] = {}
+        self._drug_ids: List[str] = []
+        self._records: List[Tuple[str, str, str, Optional[str]]] = []
+        self._pairs: Dict[int, List[int]] = {}
+        self._name_to_id = name_to_id or {}
+        self.dataset_version = dataset_version
+
+        for drug1, drug2, description, adverse_effects in records:
+            if not isinstance(drug1, str) or not isinstance(drug2, str):
+                continue
+            # Self-interactions are never reported
+            if drug1 == drug2:
+                continue
+            drug1, drug2 = self._intern(drug1), self._intern(drug2)
+            key = pair_key(self._codes[drug1], self._codes[drug2])
+            self._pairs.setdefault(key, []).append(len(self._records))
+            self._records.append((drug1, drug2, description, adverse_effects))
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame", name_to_id: Optional[Dict[str, str]] = None, dataset_version: str = "") -> "InteractionIndex":
+        import pandas as pd
+        adverse = [None if pd.isna(value) else value for value in df["Adverse Effects"]]
+        return cls(zip(df["Drug1"], df["Drug2"], df["Interaction"], adverse), name_to_id, dataset_version)
+
+    def _intern(self, drug_id: str) -> str:
+        drug_id = sys.intern(drug_id)
+        if drug_id not in self._codes:
+            self._codes[drug_id] = len(self._drug_ids)
+            self._drug_ids.append(drug_id)
+        return drug_id
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def code(self, drug_id: str) -> Optional[int]:
+        return self._codes.get(drug_id)
+
+    def drug_id(self, code: int) -> str:
+        return self._drug_ids[code]
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self._name_to_id.get(name)
+
+    def names(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._name_to_id.items())
+
+    def lookup(self, code_a: int, code_b: int) -> List[Tuple[str, str, str, Optional[str]]]:
+        return [self._records[i] for i in self._pairs.get(pair_key(code_a, code_b), ())]
+
+    def lookup_keys(self, keys: np.ndarray) -> Dict[int, List[Tuple[str, str, str, Optional[str]]]]:
+        found = {}
+        for key in keys.tolist():
+            rows = self._pairs.get(key)
+            if rows:
+                found[key] = [self._records[i] for i in rows]
+        return found
+
+
+@lru_cache(maxsize=256)
+def _pair_indices(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Positions (i, j), i < j, of every pair in a list of n drugs; lists repeat sizes a lot
+    return np.triu_indices(n, 1)
+
 
 class InteractionService:
     _instance = None
-    _synonyms = {}
-    _interactions_df = None
-    _name_to_id_map = {}
+    _index = InteractionIndex(())
+    _matcher = DrugNameMatcher(())
+    _foods = FoodInteractionTable()
+    _sources: Dict[str, Any] = {}
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(InteractionService, cls).__new__(cls)
-            cls._instance._load_data()
+        with _instance_lock:
+            if cls._instance is None:
+                instance = super(InteractionService, cls).__new__(cls)
+                instance._load_data()
+                cls._instance = instance
         return cls._instance
 
     def _load_data(self):
         print(f"Loading drug interaction data from {DATASET_DIR}...")
+        # Taken before reading, so an edit made while loading triggers another reload
+        self._sources = source_fingerprint(*SOURCE_PATHS)
+        try:
+            self._index = load_index(INTERACTIONS_PATH, DRUG_SYNONYMS_PATH, INTERACTION_INDEX_PATH)
+            print(f"Drug interaction index mapped from {INTERACTION_INDEX_PATH} ({len(self._index)} interactions).")
+        except Exception as e:
+            print(f"Compiled interaction index unavailable ({e}), loading CSV directly.")
+            self._index = self._load_csv_index()
+
+        self._matcher = DrugNameMatcher(self._index.names())
+
+        try:
+            self._foods = FoodInteractionTable.from_files(FOOD_INTERACTIONS_PATH, FOOD_SYNONYMS_PATH)
+            if len(self._foods):
+                print(f"Drug-food interaction data loaded ({len(self._foods)} interactions).")
+        except Exception as e:
+            print(f"Error loading drug-food interaction data: {e}")
+
+    def _load_csv_index(self) -> InteractionIndex:
+        # pandas is only needed on this fallback path; mapped workers never import it
+        import pandas as pd
+
+        name_to_id = {}
         try:
             # Load synonyms
             if os.path.exists(DRUG_SYNONYMS_PATH):
                 with open(DRUG_SYNONYMS_PATH, "r", encoding="utf-8") as f:
-                    self._synonyms = json.load(f)
+                    synonyms = json.load(f)
                 
                 # Create reverse map: Name -> ID
-                for drug_id, names in self._synonyms.items():
+                for drug_id, names in synonyms.items():
                     for name in names:
                         if name:
-                            self._name_to_id_map[name.lower()] = drug_id
+                            name_to_id[name.lower()] = drug_id
             else:
                 print(f"Warning: Synonyms file not found at {DRUG_SYNONYMS_PATH}")
 
             # Load interactions CSV
             if os.path.exists(INTERACTIONS_PATH):
-                # Using pandas for efficient querying
                 # Assuming columns: ["Drug1", "Interaction", "Drug2", "Adverse Effects"]
-                self._interactions_df = pd.read_csv(INTERACTIONS_PATH)
+                df = pd.read_csv(INTERACTIONS_PATH)
                 
                 # Clean up IDs in CSV if they have prefixes like "Compound::"
-                self._interactions_df["Drug1"] = self._interactions_df["Drug1"].apply(lambda x: x.replace("Compound::", "") if isinstance(x, str) else x)
-                self._interactions_df["Drug2"] = self._interactions_df["Drug2"].apply(lambda x: x.replace("Compound::", "") if isinstance(x, str) else x)
+                df["Drug1"] = df["Drug1"].str.replace("Compound::", "", regex=False)
+                df["Drug2"] = df["Drug2"].str.replace("Compound::", "", regex=False)
+                
+                index = InteractionIndex.from_dataframe(df, name_to_id, dataset_version(INTERACTIONS_PATH, DRUG_SYNONYMS_PATH))
                 
-                print("Drug interaction data loaded successfully.")
+                print(f"Drug interaction data loaded successfully ({len(index)} interactions indexed).")
+                return index
             else:
                 print(f"Warning: Interactions file not found at {INTERACTIONS_PATH}")
-                self._interactions_df = pd.DataFrame(columns=["Drug1", "Interaction", "Drug2", "Adverse Effects"])
 
         except Exception as e:
             print(f"Error loading interaction data: {e}")
-            # Initialize empty if failed to prevent crashes
-            self._interactions_df = pd.DataFrame(columns=["Drug1", "Interaction", "Drug2", "Adverse Effects"])
+
+        # Initialize empty if failed to prevent crashes
+        return InteractionIndex((), name_to_id)
+
+    @property
+    def dataset_version(self) -> str:
+        if self._foods.dataset_version:
+            return f"{self._index.dataset_version}.{self._foods.dataset_version[:6]}"
+        return self._index.dataset_version
 
     def get_drug_id(self, drug_name: str) -> str:
-        return self._name_to_id_map.get(drug_name.lower())
+        return self._index.resolve(drug_name.lower())
+
+    def resolve_drug(self, drug_name: str) -> Optional[Dict[str, Any]]:
+        # Exact synonym first, then the name with dose/formulation noise stripped, then
+        # the best trigram match if it clears FUZZY_MATCH_MIN_SCORE.
+        drug_id = self.get_drug_id(drug_name)
+        if drug_id:
+            return {"name": drug_name, "drug_id": drug_id, "matched_name": drug_name.lower(), "score": 1.0, "method": "exact"}
+
+        normalized = self._matcher.exact(drug_name)
+        if normalized:
+            return {"name": drug_name, "drug_id": normalized[1], "matched_name": normalized[0], "score": 1.0, "method": "normalized"}
+
+        candidates = self._matcher.search(drug_name, limit=1, min_score=FUZZY_MATCH_MIN_SCORE)
+        if candidates:
+            matched_name, drug_id, score = candidates[0]
+            return {"name": drug_name, "drug_id": drug_id, "matched_name": matched_name, "score": score, "method": "fuzzy"}
+
+        return None
+
+    def drug_candidates(self, drug_name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return [
+            {"name": matched_name, "drug_id": drug_id, "score": score}
+            for matched_name, drug_id, score in self._matcher.search(drug_name, limit=limit)
+        ]
+
+    @timed(INTERACTION_CHECK_SECONDS, operation="suggest")
+    def suggest_drugs(self, prefix: str, limit: int = 10) -> List[Dict[str, str]]:
+        return [{"name": name, "drug_id": drug_id} for name, drug_id in self._matcher.complete(prefix, limit)]
+
+    @timed(INTERACTION_CHECK_SECONDS, operation="pair")
+    def interactions_between(self, drug_id_a: str, drug_id_b: str) -> List[Dict[str, Any]]:
+        # All dataset rows for one pair of drug ids; drug1/drug2 are reported as ids
+        index = self._index
+        code_a, code_b = index.code(drug_id_a), index.code(drug_id_b)
+        if code_a is None or code_b is None or code_a == code_b:
+            return []
+        return [self._format_interaction(row, {}) for row in index.lookup(code_a, code_b)]
 
     def check_interactions(self, drug_names: List[str]) -> List[Dict[str, Any]]:
+        return self.check_interactions_detailed(drug_names)["interactions"]
+
+    def _resolve(self, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[int]]:
+        # (resolved match, unresolved entry, dataset code); exactly one of the first two is set
+        match = self.resolve_drug(name)
+        if match is None:
+            # Without an ID the dataset cannot be queried, so report the name back
+            # with the closest candidates instead of silently treating it as safe.
+            return None, {"name": name, "candidates": self.drug_candidates(name)}, None
+        # Drugs that never appear in the dataset have no code and cannot interact
+        return match, None, self._index.code(match["drug_id"])
+
+    @staticmethod
+    def _format_interaction(row: Tuple[str, str, str, Optional[str]], drug_ids: Dict[str, str]) -> Dict[str, Any]:
+        id1, id2, description, adverse_effects = row
+        return {
+            "drug1": drug_ids.get(id1, id1),
+            "drug2": drug_ids.get(id2, id2),
+            "description": description,
+            "severity": "Moderate", # Defaulting as dataset does not specify
+            "adverse_effects": adverse_effects if adverse_effects is not None else "Not specified"
+        }
+
+    def _check_foods(self, drug_ids: Dict[str, str], foods: Sequence[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        # k drugs x f foods dict probes; returns (food interactions, unrecognised food names)
+        found = []
+        unresolved = []
+        for food in foods:
+            food_key = self._foods.resolve_food(food)
+            if food_key is None:
+                unresolved.append(food)
+                continue
+            for drug_id, drug_name in drug_ids.items():
+                for description, severity in self._foods.lookup(drug_id, food_key):
+                    found.append({
+                        "drug": drug_name,
+                        "food": food,
+                        "description": description,
+                        "severity": severity or "Moderate"
+                    })
+        return found, unresolved
+
+    @timed(INTERACTION_CHECK_SECONDS, operation="check")
+    def check_interactions_detailed(self, drug_names: List[str], foods: Sequence[str] = ()) -> Dict[str, Any]:
         drug_ids = {}
+        resolved = []
+        unresolved = []
+        codes = []
         found_interactions = []
 
         # Resolve names to IDs
         for name in drug_names:
-            drug_id = self.get_drug_id(name)
-            if drug_id:
-                drug_ids[drug_id] = name
+            match, missing, code = self._resolve(name)
+            if match:
+                drug_ids[match["drug_id"]] = name
+                resolved.append(match)
+                if code is not None and code not in codes:
+                    codes.append(code)
             else:
-                # Try fuzzy match or just keep name if no ID found? 
-                # Without ID, we can not query the CSV which uses IDs.
-                pass
-        
-        if len(drug_ids) < 2:
-            return []
+                unresolved.append(missing)
 
-        ids_to_check = list(drug_ids.keys())
-        
-        if self._interactions_df is None or self._interactions_df.empty:
-            return []
+        index = self._index
 
-        # Query DataFrame
-        # We want rows where Drug1 is in our list AND Drug2 is in our list
-        mask = (
-            (self._interactions_df["Drug1"].isin(ids_to_check)) & 
-            (self._interactions_df["Drug2"].isin(ids_to_check))
-        )
-        
-        results = self._interactions_df[mask]
-        
-        for _, row in results.iterrows():
-            id1 = row["Drug1"]
-            id2 = row["Drug2"]
-            
-            # Skip self-interactions if any
-            if id1 == id2:
-                continue
+        # O(k^2) pair lookups in the number of requested drugs, independent of dataset size
+        for i in range(len(codes)):
+            for j in range(i + 1, len(codes)):
+                for row in index.lookup(codes[i], codes[j]):
+                    found_interactions.append(self._format_interaction(row, drug_ids))
 
-            interaction = {
-                "drug1": drug_ids.get(id1, id1),
-                "drug2": drug_ids.get(id2, id2),
-                "description": row["Interaction"],
-                "severity": "Moderate", # Defaulting as dataset does not specify
-                "adverse_effects": row["Adverse Effects"] if pd.notna(row["Adverse Effects"]) else "Not specified"
-            }
-            found_interactions.append(interaction)
+        food_interactions, unresolved_foods = self._check_foods(drug_ids, foods)
             
-        return found_interactions
+        return {
+            "interactions": found_interactions,
+            "food_interactions": food_interactions,
+            "resolved": resolved,
+            "unresolved": unresolved,
+            "unresolved_foods": unresolved_foods
+        }
+
+    @timed(INTERACTION_CHECK_SECONDS, operation="batch")
+    def check_interactions_batch(
+            self,
+            drug_lists: Sequence[Sequence[str]],
+            resolutions: Optional[Dict[str, Tuple]] = None,
+            food_lists: Optional[Sequence[Sequence[str]]] = None) -> List[Dict[str, Any]]:
+        # Screens many medication lists at once; each result has the same shape as
+        # check_interactions_detailed. Every distinct name is resolved once (pass the same
+        # `resolutions` dict to share that work between calls), and the pairs of all
+        # lists are looked up in a single vectorised pass over the index.
+        if resolutions is None:
+            resolutions = {}
+        index = self._index
+
+        results = []
+        key_chunks = []
+        owner_chunks = []
+        for list_no, names in enumerate(drug_lists):
+            drug_ids = {}
+            resolved = []
+            unresolved = []
+            codes = set()
+            for name in names:
+                if name not in resolutions:
+                    resolutions[name] = self._resolve(name)
+                match, missing, code = resolutions[name]
+                if match:
+                    drug_ids[match["drug_id"]] = name
+                    resolved.append(match)
+                    if code is not None:
+                        codes.add(code)
+                else:
+                    unresolved.append(missing)
+            food_interactions, unresolved_foods = self._check_foods(drug_ids, food_lists[list_no] if food_lists else ())
+            results.append({
+                "interactions": [],
+                "food_interactions": food_interactions,
+                "resolved": resolved,
+                "unresolved": unresolved,
+                "unresolved_foods": unresolved_foods,
+                "_drug_ids": drug_ids
+            })
+
+            if len(codes) > 1:
+                # Sorted codes make every (i < j) pair already ordered for pair_key
+                ordered = np.array(sorted(codes), dtype=np.uint64)
+                first, second = _pair_indices(len(ordered))
+                key_chunks.append((ordered[first] << np.uint64(32)) | ordered[second])
+                owner_chunks.append(np.full(len(first), list_no, dtype=np.int64))
+
+        if key_chunks:
+            keys = np.concatenate(key_chunks)
+            owners = np.concatenate(owner_chunks)
+            found = index.lookup_keys(np.unique(keys))
+            if found:
+                hits = np.flatnonzero(np.isin(keys, np.fromiter(found, dtype=np.uint64, count=len(found))))
+                for i in hits:
+                    result = results[owners[i]]
+                    for row in found[int(keys[i])]:
+                        result["interactions"].append(self._format_interaction(row, result["_drug_ids"]))
+
+        for result in results:
+            del result["_drug_ids"]
+        return results
+
+def screen_medication_lists(
+        service: InteractionService,
+        drug_lists: Iterable[Sequence[str]],
+        chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    # In-process bulk screening (e.g. nightly reconciliation jobs): yields one result per
+    # list, in input order, processing BATCH_SCREEN_CHUNK_SIZE lists per vectorised pass.
+    chunk_size = chunk_size or BATCH_SCREEN_CHUNK_SIZE
+    resolutions: Dict[str, Tuple] = {}
+    chunk = []
+    for names in drug_lists:
+        chunk.append(names)
+        if len(chunk) == chunk_size:
+            yield from service.check_interactions_batch(chunk, resolutions)
+            chunk = []
+    if chunk:
+        yield from service.check_interactions_batch(chunk, resolutions)
+
+
+def start_warmup() -> Future:
+    # Loads the service on a background thread; safe to call repeatedly.
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Future()
+            threading.Thread(target=_warmup_worker, args=(_warmup,), name="interaction-warmup", daemon=True).start()
+        return _warmup
+
 
-interaction_service = InteractionService()
+def _warmup_worker(future: Future):
+    global _warmup_failed_at
+    try:
+        future.set_result(InteractionService())
+    except BaseException as e:
+        _warmup_failed_at = time.monotonic()
+        future.set_exception(e)
 
+
+def _retry_failed_warmup() -> Future:
+    # A failed load is not cached for the life of the process: once INTERACTIONS_RETRY_SECONDS
+    # have passed, the failed future is dropped and start_warmup begins a new attempt.
+    global _warmup
+    with _warmup_lock:
+        if (_warmup is not None and _warmup.done() and _warmup.exception() is not None
+                and time.monotonic() - _warmup_failed_at >= INTERACTIONS_RETRY_SECONDS):
+            _warmup = None
+    return start_warmup()
+
+
+def _validate_reload(fresh: InteractionService, current: Optional[InteractionService]):
+    # A failed CSV parse or a truncated upload loads as an empty index; never swap a
+    # working dataset for one of those.
+    if len(fresh._index) == 0 and (current is None or len(current._index) > 0):
+        raise InteractionReloadError("New interaction dataset has no interactions")
+    if len(fresh._matcher) == 0 and (current is None or len(current._matcher) > 0):
+        raise InteractionReloadError("New interaction dataset has no drug names")
+    for name, drug_id in itertools.islice(fresh._index.names(), 100):
+        if fresh._index.resolve(name) != drug_id:
+            raise InteractionReloadError(f"Drug name {name!r} does not resolve in the new index")
+
+
+def reload_interaction_service() -> InteractionService:
+    # Loads the current dataset files into a new service on the calling thread, validates
+    # it, then swaps it in with a single reference assignment. Requests that already
+    # hold the old service finish on it; later requests get the new one.
+    global _warmup
+    if not _reload_lock.acquire(blocking=False):
+        raise ReloadInProgressError("An interaction dataset reload is already running")
+    try:
+        try:
+            current = start_warmup().result()
+        except Exception:
+            current = None
+
+        fresh = object.__new__(InteractionService)
+        fresh._load_data()
+        _validate_reload(fresh, current)
+
+        loaded = Future()
+        loaded.set_result(fresh)
+        with _instance_lock, _warmup_lock:
+            InteractionService._instance = fresh
+            _warmup = loaded
+
+        previous = current.dataset_version if current else None
+        print(f"Drug interaction dataset reloaded: {previous} -> {fresh.dataset_version}")
+        return fresh
+    finally:
+        _reload_lock.release()
+
+
+async def _watch_sources(interval: float):
+    # Polls size/mtime of the source files (two stat calls) rather than depending on a
+    # platform file-notification library.
+    rejected = None
+    while True:
+        await asyncio.sleep(interval)
+        if interaction_service_status() != "ready":
+            continue
+        sources = source_fingerprint(*SOURCE_PATHS)
+        if sources == start_warmup().result()._sources or sources == rejected:
+            continue
+        try:
+            await asyncio.to_thread(reload_interaction_service)
+        except ReloadInProgressError:
+            pass
+        except Exception as e:
+            # Keep serving the old dataset until the files change again
+            print(f"Drug interaction reload failed: {e}")
+            rejected = sources
+
+
+def start_dataset_watcher():
+    global _watcher
+    if INTERACTIONS_WATCH_SECONDS > 0 and _watcher is None:
+        _watcher = asyncio.create_task(_watch_sources(INTERACTIONS_WATCH_SECONDS))
+
+
+async def stop_dataset_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        await asyncio.gather(_watcher, return_exceptions=True)
+        _watcher = None
+
+
+def interaction_service_status() -> str:
+    if _warmup is None:
+        return "not_started"
+    if not _warmup.done():
+        return "loading"
+    return "failed" if _warmup.exception() else "ready"
+
+
+async def get_interaction_service(timeout: Optional[float] = None) -> InteractionService:
+    # Requests arriving during warm-up queue here for up to `timeout` seconds, then
+    # get asyncio.TimeoutError so the caller can fail fast instead of piling up. A failed
+    # load raises InteractionServiceUnavailableError.
+    future = _retry_failed_warmup()
+    if not future.done():
+        if timeout is None:
+            timeout = INTERACTIONS_READY_TIMEOUT_SECONDS
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            raise
+        except Exception:
+            pass
+    error = future.exception()
+    if error is not None:
+        raise InteractionServiceUnavailableError(f"Drug interaction data failed to load: {error}") from error
+    return future.result()
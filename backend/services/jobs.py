@@ -0,0 +1,246 @@
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Optional, List
+
+from db import get_db
+from services.audit import log_event
+from services.image_analysis import run_image_analysis, save_image_analysis
+
+ANALYSIS_WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "2"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+ANALYSIS_JOB_RETRY_SECONDS = float(os.getenv("ANALYSIS_JOB_RETRY_SECONDS", "5"))
+ANALYSIS_JOB_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", "2"))
+# A running job is owned by its worker process until the lease expires; the owner renews
+# it while the job runs, so only jobs of a process that died are ever handed back.
+ANALYSIS_JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "120"))
+
+# Identifies this process in analysis_jobs.claimed_by
+WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+JOB_COLUMNS = "id, patient_id, image_id, status, attempts, max_attempts, refresh, result, error, created_at, updated_at"
+
+_wakeup: Optional[asyncio.Event] = None
+_workers: List[asyncio.Task] = []
+_last_recovery = 0.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def create_job(patient_id: str, image_id: str, refresh: bool = False, result: Optional[str] = None) -> dict:
+    job_id = f"job_{uuid.uuid4().hex[:12]}"
+    now = _now().isoformat()
+    # A job created with a result (e.g. a cache hit) is finished before any worker sees it.
+    status = "succeeded" if result is not None else "queued"
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO analysis_jobs ({JOB_COLUMNS}, next_run_at)
+            VALUES (?, ?, ?, ?, 0, ?, ?, ?, NULL, ?, ?, ?)
+        """, (job_id, patient_id, image_id, status, ANALYSIS_JOB_MAX_ATTEMPTS, int(refresh), result, now, now, now))
+
+    if status == "queued" and _wakeup is not None:
+        _wakeup.set()
+
+    return get_job(job_id)
+
+
+def get_job(job_id: str, patient_id: Optional[str] = None) -> Optional[dict]:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if patient_id:
+            cursor.execute(f"SELECT {JOB_COLUMNS} FROM analysis_jobs WHERE id = ? AND patient_id = ?", (job_id, patient_id))
+        else:
+            cursor.execute(f"SELECT {JOB_COLUMNS} FROM analysis_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+
+    return dict(row) if row else None
+
+
+def list_jobs(patient_id: str, status: Optional[str] = None) -> List[dict]:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if status:
+            cursor.execute(
+                f"SELECT {JOB_COLUMNS} FROM analysis_jobs WHERE patient_id = ? AND status = ? ORDER BY created_at DESC",
+                (patient_id, status)
+            )
+        else:
+            cursor.execute(
+                f"SELECT {JOB_COLUMNS} FROM analysis_jobs WHERE patient_id = ? ORDER BY created_at DESC",
+                (patient_id,)
+            )
+        rows = cursor.fetchall()
+
+    return [dict(row) for row in rows]
+
+
+def _lease_until(now: datetime) -> str:
+    return (now + timedelta(seconds=ANALYSIS_JOB_LEASE_SECONDS)).isoformat()
+
+
+def recover_jobs() -> int:
+    # Jobs whose owner stopped renewing the lease (the process died) go back to the queue.
+    # Jobs still leased by a live worker, in this process or another, are left alone.
+    now = _now().isoformat()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE analysis_jobs SET status = 'queued', claimed_by = NULL, lease_expires = NULL, updated_at = ?
+            WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)
+        """, (now, now))
+        return cursor.rowcount
+
+
+def claim_next_job() -> Optional[dict]:
+    now = _now()
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM analysis_jobs WHERE status = 'queued' AND next_run_at <= ? ORDER BY created_at LIMIT 1",
+            (now.isoformat(),)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        # The status guard keeps two workers (or two processes) from claiming the same job.
+        cursor.execute("""
+            UPDATE analysis_jobs SET status = 'running', attempts = attempts + 1, updated_at = ?,
+                claimed_by = ?, lease_expires = ?
+            WHERE id = ? AND status = 'queued'
+        """, (now.isoformat(), WORKER_NAME, _lease_until(now), row["id"]))
+        if cursor.rowcount != 1:
+            return None
+
+    return get_job(row["id"])
+
+
+def renew_lease(job_id: str) -> bool:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE analysis_jobs SET lease_expires = ? WHERE id = ? AND status = 'running' AND claimed_by = ?",
+            (_lease_until(_now()), job_id, WORKER_NAME)
+        )
+        return cursor.rowcount == 1
+
+
+async def _keep_leased(job_id: str):
+    while True:
+        await asyncio.sleep(ANALYSIS_JOB_LEASE_SECONDS / 3)
+        if not renew_lease(job_id):
+            print(f"Analysis job {job_id} lease lost")
+            return
+
+
+def _fail_or_retry(job: dict, error: str):
+    now = _now()
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if job["attempts"] < job["max_attempts"]:
+            delay = ANALYSIS_JOB_RETRY_SECONDS * (2 ** (job["attempts"] - 1))
+            cursor.execute("""
+                UPDATE analysis_jobs SET status = 'queued', error = ?, updated_at = ?, next_run_at = ?,
+                    claimed_by = NULL, lease_expires = NULL
+                WHERE id = ? AND claimed_by = ?
+            """, (error, now.isoformat(), (now + timedelta(seconds=delay)).isoformat(), job["id"], WORKER_NAME))
+        else:
+            cursor.execute(
+                "UPDATE analysis_jobs SET status = 'failed', error = ?, updated_at = ?, lease_expires = NULL WHERE id = ? AND claimed_by = ?",
+                (error, now.isoformat(), job["id"], WORKER_NAME)
+            )
+
+
+async def process_job(job: dict):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT storage_path FROM images WHERE id = ? AND patient_id = ?", (job["image_id"], job["patient_id"]))
+        row = cursor.fetchone()
+
+    if not row:
+        with get_db() as conn:
+            conn.cursor().execute(
+                "UPDATE analysis_jobs SET status = 'failed', error = ?, updated_at = ?, lease_expires = NULL WHERE id = ? AND claimed_by = ?",
+                ("Image not found", _now().isoformat(), job["id"], WORKER_NAME)
+            )
+        return
+
+    try:
+        result, cached = await run_image_analysis(row["storage_path"], refresh=bool(job["refresh"]))
+    except Exception as e:
+        print(f"Analysis job {job['id']} error: {e}")
+        _fail_or_retry(job, str(e)[:200])
+        return
+
+    if result is None:
+        _fail_or_retry(job, "Image analysis provider failed")
+        return
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        save_image_analysis(cursor, job["image_id"], result)
+        cursor.execute(
+            "UPDATE analysis_jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ?, lease_expires = NULL "
+            "WHERE id = ? AND claimed_by = ?",
+            (result, _now().isoformat(), job["id"], WORKER_NAME)
+        )
+
+    log_event("IMAGE_ANALYZED", job["patient_id"], {"image_id": job["image_id"], "job_id": job["id"], "cached": cached})
+
+
+async def worker_loop(worker_id: int):
+    global _last_recovery
+    loop = asyncio.get_running_loop()
+    while True:
+        job = claim_next_job()
+        if job is None:
+            # Idle workers also pick up jobs orphaned by a process that died since startup
+            if loop.time() - _last_recovery >= ANALYSIS_JOB_LEASE_SECONDS / 2:
+                _last_recovery = loop.time()
+                recovered = recover_jobs()
+                if recovered:
+                    print(f"Re-queued {recovered} analysis jobs with expired leases.")
+                    continue
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=ANALYSIS_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        lease = asyncio.create_task(_keep_leased(job["id"]))
+        try:
+            await process_job(job)
+        except Exception as e:
+            print(f"Analysis worker {worker_id} error: {e}")
+            _fail_or_retry(job, str(e)[:200])
+        finally:
+            lease.cancel()
+
+
+def start_workers():
+    global _wakeup, _last_recovery
+    _wakeup = asyncio.Event()
+
+    _last_recovery = asyncio.get_running_loop().time()
+    recovered = recover_jobs()
+    if recovered:
+        print(f"Re-queued {recovered} interrupted analysis jobs.")
+
+    for worker_id in range(ANALYSIS_WORKER_CONCURRENCY):
+        _workers.append(asyncio.create_task(worker_loop(worker_id)))
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -1,46 +1,93 @@
 import os
 import base64
-import httpx
-from typing import Optional
+from typing import Optional, Tuple, BinaryIO
+
+from services.executor import run_in_process
+from services.files import spooled_path
+from services.metrics import model_call
+from services.tracing import traced
+from services.preprocess import preprocess_image, preprocess_image_bytes, preprocess_image_file, MEDGEMMA_INPUT_SIZE
 
 HF_TOKEN = os.getenv("HF_TOKEN")
 HF_MODEL_ID = os.getenv("HF_MODEL_ID", "google/medgemma-4b-it")
 HF_INFERENCE_ENDPOINT_URL = os.getenv("HF_INFERENCE_ENDPOINT_URL")
+MEDGEMMA_PROVIDER = os.getenv("MEDGEMMA_PROVIDER") or "huggingface"
+MEDGEMMA_TIMEOUT_SECONDS = float(os.getenv("MEDGEMMA_TIMEOUT_SECONDS", "60"))
+
+# Bump PROMPT_VERSION whenever IMAGE_ANALYSIS_PROMPT changes so cached results are not reused.
+PROMPT_VERSION = "v1"
+IMAGE_ANALYSIS_PROMPT = "Analyze this medical image. Provide observations about any visible structures, potential areas of interest, and general quality assessment. Note: This is assistive, non-diagnostic output only."
+
+def get_provider() -> str:
+    return "medgemma" if HF_TOKEN else "mock"
+
+def get_model() -> str:
+    return HF_INFERENCE_ENDPOINT_URL or HF_MODEL_ID
 
-async def analyze_medical_image(image_path: str) -> str:
+def _load_model_input(image_path: str, content_hash: Optional[str], cache: bool = True) -> Tuple[bytes, str]:
+    if content_hash is None:
+        return preprocess_image_file(image_path)
+    with open(image_path, "rb") as f:
+        return preprocess_image(f, content_hash, cache=cache)
+
+@traced("medgemma.analyze_medical_image")
+async def analyze_medical_image(image_path: str, content_hash: Optional[str] = None) -> str:
     if not HF_TOKEN:
         return generate_mock_analysis(image_path)
-    
-    try:
-        with open(image_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode("utf-8")
-        
-        ext = os.path.splitext(image_path)[1].lower()
-        mime_type = "image/png" if ext == ".png" else "image/jpeg"
-        
-        if HF_INFERENCE_ENDPOINT_URL:
-            url = HF_INFERENCE_ENDPOINT_URL
-        else:
-            # Updated 2026: Use router.huggingface.co instead of api-inference.huggingface.co
-            url = f"https://router.huggingface.co/models/{HF_MODEL_ID}"
+
+    return await _request_analysis(_load_model_input, image_path, content_hash)
+
+@traced("medgemma.analyze_medical_image_buffer")
+async def analyze_medical_image_buffer(fp: BinaryIO, content_hash: str, filename: str) -> str:
+    # For transient uploads held by spool_upload, never stored under our name.
+    if not HF_TOKEN:
+        return generate_mock_analysis(filename)
+
+    # The decode runs in another process: large uploads are opened there by path, and
+    # only small in-memory ones are sent across as bytes.
+    path = spooled_path(fp)
+    if path is not None:
+        fp.flush()
+        return await _request_analysis(_load_model_input, path, content_hash, False)
+    fp.seek(0)
+    return await _request_analysis(preprocess_image_bytes, fp.read(), content_hash, MEDGEMMA_INPUT_SIZE, False)
+
+class HuggingFaceImageProvider:
+    # Hugging Face inference API: {"inputs": {"image", "text"}} in, [{"generated_text"}] out.
+    # HF_INFERENCE_ENDPOINT_URL points it at a dedicated endpoint or the local stub server.
+    name = "medgemma"
+
+    def __init__(self, url: Optional[str] = None, token: Optional[str] = None, timeout: float = MEDGEMMA_TIMEOUT_SECONDS):
+        # Updated 2026: Use router.huggingface.co instead of api-inference.huggingface.co
+        self.url = url or HF_INFERENCE_ENDPOINT_URL or f"https://router.huggingface.co/models/{HF_MODEL_ID}"
+        self.token = token or HF_TOKEN
+        self.timeout = timeout
+
+    async def analyze(self, image_bytes: bytes, mime_type: str) -> Optional[str]:
+        import httpx
+
+        image_data = base64.b64encode(image_bytes).decode("utf-8")
         
         headers = {
-            "Authorization": f"Bearer {HF_TOKEN}",
+            "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
         
         payload = {
             "inputs": {
                 "image": f"data:{mime_type};base64,{image_data}",
-                "text": "Analyze this medical image. Provide observations about any visible structures, potential areas of interest, and general quality assessment. Note: This is assistive, non-diagnostic output only."
+                "text": IMAGE_ANALYSIS_PROMPT
             },
             "parameters": {
                 "max_new_tokens": 500
             }
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
+        with model_call("medgemma", "image_analysis") as call:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(self.url, headers=headers, json=payload)
+            if response.status_code != 200:
+                call.fail(f"http_{response.status_code}")
             
             if response.status_code == 200:
                 result = response.json()
@@ -59,6 +106,30 @@ async def analyze_medical_image(image_path: str) -> str:
                 print(f"MedGemma API Error {response.status_code}: {response.text}")
                 # Return None to indicate failure so main.py can fallback to Gemini Vision
                 return None
+
+
+IMAGE_PROVIDERS = {"huggingface": HuggingFaceImageProvider}
+_image_provider = None
+
+
+def get_image_provider():
+    global _image_provider
+    if _image_provider is None:
+        _image_provider = IMAGE_PROVIDERS[MEDGEMMA_PROVIDER]()
+    return _image_provider
+
+
+def set_image_provider(provider):
+    # Swap in any object with an async analyze(image_bytes, mime_type) -> Optional[str]
+    global _image_provider
+    _image_provider = provider
+
+
+async def _request_analysis(load_input, *args) -> Optional[str]:
+    try:
+        # Downsampled, metadata-free JPEG at the model's input resolution instead of the raw upload
+        image_bytes, mime_type = await run_in_process(load_input, *args)
+        return await get_image_provider().analyze(image_bytes, mime_type)
                 
     except Exception as e:
         print(f"MedGemma Exception: {e}")
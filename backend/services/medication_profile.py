@@ -0,0 +1,130 @@
+import uuid
+import json
+from datetime import datetime, timezone
+from itertools import combinations
+from typing import List, Optional
+
+from db import get_db
+from services.drug_names import normalize_drug_name
+
+MEDICATION_COLUMNS = "id, patient_id, name, dosage, frequency, drug_key, drug_id, source, status, added_at, stopped_at"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def drug_key(name: str, match: Optional[dict]) -> str:
+    # Resolved medications are keyed by drug id, so "Glucophage" and "Metformin 500mg"
+    # are one entry; unmatched names fall back to their normalised text.
+    if match:
+        return match["drug_id"]
+    return f"name:{normalize_drug_name(name) or name.strip().lower()}"
+
+
+def add_medications(service, patient_id: str, medications: List[dict], source: str) -> List[str]:
+    # Adds each medication to the patient's active list, or updates dosage/frequency
+    # if the same drug is already active. Returns the ids of newly added rows.
+    now = _now()
+    added = []
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for med in medications:
+            name = (med.get("name") or "").strip()
+            if not name:
+                continue
+            dosage = med.get("dosage") or ""
+            frequency = med.get("frequency") or ""
+            match = service.resolve_drug(name)
+            key = drug_key(name, match)
+
+            cursor.execute(
+                "SELECT id FROM patient_medications WHERE patient_id = ? AND status = 'active' AND drug_key = ?",
+                (patient_id, key)
+            )
+            row = cursor.fetchone()
+            if row:
+                cursor.execute(
+                    "UPDATE patient_medications SET name = ?, dosage = ?, frequency = ? WHERE id = ?",
+                    (name, dosage, frequency, row["id"])
+                )
+                continue
+
+            med_id = f"med_{uuid.uuid4().hex[:12]}"
+            cursor.execute(f"""
+                INSERT INTO patient_medications ({MEDICATION_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, NULL)
+            """, (med_id, patient_id, name, dosage, frequency, key, match["drug_id"] if match else None, source, now))
+            added.append(med_id)
+
+    return added
+
+
+def stop_medication(patient_id: str, medication_id: str) -> bool:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE patient_medications SET status = 'stopped', stopped_at = ? WHERE id = ? AND patient_id = ? AND status = 'active'",
+            (_now(), medication_id, patient_id)
+        )
+        return cursor.rowcount > 0
+
+
+def get_profile(service, patient_id: str) -> dict:
+    # Active medications plus the interactions between them. Pair results are cached per
+    # patient and dataset version, so only pairs that are new (a drug was just added) or
+    # stale (the dataset was reloaded) are evaluated; everything else is read back.
+    version = service.dataset_version
+    now = _now()
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {MEDICATION_COLUMNS} FROM patient_medications
+            WHERE patient_id = ? AND status = 'active'
+            ORDER BY added_at
+        """, (patient_id,))
+        medications = [dict(row) for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT drug_a, drug_b, dataset_version, interactions_json FROM patient_interaction_pairs WHERE patient_id = ?",
+            (patient_id,)
+        )
+        cached = {(row["drug_a"], row["drug_b"]): (row["dataset_version"], row["interactions_json"]) for row in cursor.fetchall()}
+
+        names = {}
+        for med in medications:
+            if med["drug_id"]:
+                names.setdefault(med["drug_id"], med["name"])
+
+        interactions = []
+        evaluated = 0
+        for drug_a, drug_b in combinations(sorted(names), 2):
+            hit = cached.get((drug_a, drug_b))
+            if hit and hit[0] == version:
+                found = json.loads(hit[1]) if hit[1] != "[]" else []
+            else:
+                found = service.interactions_between(drug_a, drug_b)
+                evaluated += 1
+                cursor.execute("""
+                    INSERT OR REPLACE INTO patient_interaction_pairs
+                    (patient_id, drug_a, drug_b, dataset_version, interactions_json, checked_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (patient_id, drug_a, drug_b, version, json.dumps(found), now))
+
+            for interaction in found:
+                interactions.append({
+                    **interaction,
+                    "drug1": names.get(interaction["drug1"], interaction["drug1"]),
+                    "drug2": names.get(interaction["drug2"], interaction["drug2"])
+                })
+
+    return {
+        "patient_id": patient_id,
+        "medications": medications,
+        "interactions": interactions,
+        "unresolved": [med["name"] for med in medications if not med["drug_id"]],
+        "dataset_version": version,
+        "evaluated_pairs": evaluated
+    }
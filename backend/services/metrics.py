@@ -0,0 +1,289 @@
+import time
+import inspect
+import functools
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from services.tracing import span
+
+# Minimal Prometheus text-format registry: counters, gauges and histograms with labels,
+# plus collector callbacks for values read at scrape time. Each worker process keeps
+# its own registry, so a scrape reflects the worker that answered it.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        # One value holder per label combination
+        ...
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, key)))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, cumulative
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+def register_collector(collector: Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]):
+    # collector() returns (name, type, help, labels, value) tuples computed at scrape time
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    described = set()
+    for collector in _collectors:
+        try:
+            samples = collector()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+            continue
+        for name, metric_type, documentation, labels, value in samples:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = Counter("arogya_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("arogya_http_request_seconds", "HTTP request latency by route.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("arogya_http_requests_in_flight", "HTTP requests currently being served.")
+SQLITE_QUERY_SECONDS = Histogram("arogya_sqlite_query_seconds", "SQLite statement execution time.", ("statement",), FAST_BUCKETS)
+DB_CONNECTION_SECONDS = Histogram("arogya_db_connection_seconds", "Time a get_db() connection is held.")
+MODEL_CALL_SECONDS = Histogram("arogya_model_call_seconds", "Model call latency by provider.", ("provider", "operation"))
+MODEL_CALL_ERRORS = Counter("arogya_model_call_errors_total", "Failed model calls by provider.", ("provider", "operation", "reason"))
+CACHE_REQUESTS = Counter("arogya_cache_requests_total", "Result cache lookups by namespace and outcome.", ("namespace", "result"))
+INTERACTION_CHECK_SECONDS = Histogram("arogya_interaction_check_seconds", "Interaction dataset lookups.", ("operation",), FAST_BUCKETS)
+EXECUTOR_TASK_SECONDS = Histogram("arogya_executor_task_seconds", "Run time of CPU executor tasks.", ("pool", "task"))
+
+
+def timed(histogram: Histogram, **labels):
+    # Decorator for sync or async functions; records wall time into histogram{labels}.
+    child = histogram.labels(**labels) if labels else histogram.labels()
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+class _ModelCall:
+    def __init__(self, provider: str, operation: str):
+        self.provider = provider
+        self.operation = operation
+        self.failed = False
+
+    def fail(self, reason: str):
+        # For calls that report failure by status code rather than by raising
+        if not self.failed:
+            self.failed = True
+            MODEL_CALL_ERRORS.labels(self.provider, self.operation, reason).inc()
+
+
+@contextmanager
+def model_call(provider: str, operation: str):
+    call = _ModelCall(provider, operation)
+    start = time.perf_counter()
+    with span(f"{provider}.{operation}", "CLIENT", **{"model.provider": provider}) as call_span:
+        try:
+            yield call
+        except Exception as e:
+            call.fail(type(e).__name__)
+            raise
+        finally:
+            MODEL_CALL_SECONDS.labels(provider, operation).observe(time.perf_counter() - start)
+            if call.failed:
+                call_span.status_code = "ERROR"
+
+
+def record_cache_lookup(namespace: str, hit: bool):
+    CACHE_REQUESTS.labels(namespace, "hit" if hit else "miss").inc()
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware task/stream overhead). The route label
+    # is the path template FastAPI stores in the scope, so /patients/{patient_id} is one
+    # series rather than one per patient.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope["method"], path).observe(elapsed)
+            HTTP_REQUESTS.labels(scope["method"], path, status).inc()
@@ -0,0 +1,137 @@
+import io
+import os
+from typing import BinaryIO, Optional, Tuple
+
+from services.files import PREPROCESSED_DIR, sweep_preprocessed_cache
+from services.result_cache import hash_file
+
+# MedGemma's vision encoder works on 896x896 inputs; anything larger is resized by the
+# model server anyway, so sending more pixels only inflates the request body.
+MEDGEMMA_INPUT_SIZE = int(os.getenv("MEDGEMMA_INPUT_SIZE", "896"))
+PREPROCESS_JPEG_QUALITY = int(os.getenv("PREPROCESS_JPEG_QUALITY", "90"))
+PREPROCESS_VERSION = "v1"
+# Prescriptions and photos sent to Gemini keep more pixels so handwriting stays legible
+GEMINI_IMAGE_MAX_SIZE = int(os.getenv("GEMINI_IMAGE_MAX_SIZE", "3072"))
+# Each process sweeps the preprocessed cache after this many writes
+PREPROCESSED_SWEEP_EVERY = 200
+
+_cache_writes = 0
+
+MAGIC_NUMBERS = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+
+def sniff_mime_type(header: bytes) -> Optional[str]:
+    for magic, mime_type in MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    if header[128:132] == b"DICM":
+        return "application/dicom"
+    return None
+
+
+def preprocessing_signature() -> str:
+    return f"{PREPROCESS_VERSION}-{MEDGEMMA_INPUT_SIZE}px-q{PREPROCESS_JPEG_QUALITY}"
+
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(PREPROCESSED_DIR, f"{content_hash}_{preprocessing_signature()}.jpg")
+
+
+def _encode(fp: BinaryIO, max_size: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    img = Image.open(fp)
+    img = ImageOps.exif_transpose(img)
+
+    # 16-bit and float scans (common for DICOM exports) are scaled down to 8-bit greyscale.
+    if img.mode in ("I;16", "I;16B", "I;16L", "I", "F"):
+        img = img.convert("I").point(lambda v: v * (1 / 256)).convert("L")
+    elif img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (0, 0, 0))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    elif img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+
+    img.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    # Saving a fresh image without exif/icc arguments drops all source metadata.
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=PREPROCESS_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def preprocess_image(fp: BinaryIO, content_hash: str, max_size: int = MEDGEMMA_INPUT_SIZE,
+                     cache: bool = True) -> Tuple[bytes, str]:
+    # Returns (payload, mime_type) ready to be sent to the model. cache=False is for
+    # transient uploads, whose preprocessed copy would never be looked up again.
+    global _cache_writes
+    cache_path = _cache_path(content_hash)
+    if cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+            os.utime(cache_path)
+            return data, "image/jpeg"
+        except OSError:
+            # Swept by another process between the check and the read
+            pass
+
+    header = fp.read(132)
+    fp.seek(0)
+
+    try:
+        data = _encode(fp, max_size)
+    except Exception as e:
+        # Formats PIL cannot decode are forwarded untouched.
+        print(f"Image preprocessing skipped: {e}")
+        fp.seek(0)
+        return fp.read(), sniff_mime_type(header) or "application/octet-stream"
+
+    if not cache:
+        return data, "image/jpeg"
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Preprocessed image cache write failed: {e}")
+
+    _cache_writes += 1
+    if _cache_writes % PREPROCESSED_SWEEP_EVERY == 0:
+        sweep_preprocessed_cache()
+
+    return data, "image/jpeg"
+
+
+def preprocess_image_bytes(content: bytes, content_hash: str, max_size: int = MEDGEMMA_INPUT_SIZE,
+                           cache: bool = True) -> Tuple[bytes, str]:
+    return preprocess_image(io.BytesIO(content), content_hash, max_size, cache)
+
+
+def encode_image_bytes(content: bytes, max_size: int = GEMINI_IMAGE_MAX_SIZE) -> bytes:
+    # Decodes an upload and re-encodes it as a bounded JPEG; raises if PIL cannot read it.
+    return _encode(io.BytesIO(content), max_size)
+
+
+def encode_image_file(image_path: str, max_size: int = GEMINI_IMAGE_MAX_SIZE) -> bytes:
+    with open(image_path, "rb") as f:
+        return _encode(f, max_size)
+
+
+def preprocess_image_file(image_path: str, max_size: int = MEDGEMMA_INPUT_SIZE) -> Tuple[bytes, str]:
+    with open(image_path, "rb") as f:
+        return preprocess_image(f, hash_file(image_path), max_size)
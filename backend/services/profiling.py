@@ -0,0 +1,162 @@
+import os
+import time
+import hmac
+import uuid
+import random
+import pstats
+import marshal
+import cProfile
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+# Fraction of requests profiled without being asked (0 disables sampling). Sampled
+# profiles are only kept when the request took at least PROFILE_MIN_DURATION_MS.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MIN_DURATION_MS = float(os.getenv("PROFILE_MIN_DURATION_MS", "500"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_TOP_FRAMES = int(os.getenv("PROFILE_TOP_FRAMES", "25"))
+
+_profiles: Deque[Dict[str, Any]] = deque(maxlen=PROFILE_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+# cProfile hooks the whole event-loop thread, so only one request is profiled at a time
+_active = threading.Lock()
+
+
+def _is_idle(frame) -> bool:
+    # The event loop blocking in epoll/kqueue/select while the request awaits I/O
+    filename, _, func = frame
+    return filename == "~" and "of 'select." in func
+
+
+def _top_frames(stats: pstats.Stats, limit: int) -> List[Dict[str, Any]]:
+    rows = [item for item in stats.stats.items() if not _is_idle(item[0])]
+    rows = sorted(rows, key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": func,
+            "file": filename,
+            "line": line,
+            "calls": calls,
+            "self_ms": round(tottime * 1000, 3),
+            "cumulative_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def _store(profile: Dict[str, Any]):
+    with _profiles_lock:
+        _profiles.append(profile)
+
+
+def list_request_profiles() -> List[Dict[str, Any]]:
+    with _profiles_lock:
+        profiles = list(_profiles)
+    return [{key: value for key, value in p.items() if key not in ("top_frames", "_pstats")} for p in reversed(profiles)]
+
+
+def get_request_profile(profile_id: str, raw: bool = False) -> Optional[Dict[str, Any]]:
+    with _profiles_lock:
+        for profile in _profiles:
+            if profile["id"] == profile_id:
+                if raw:
+                    return profile
+                return {key: value for key, value in profile.items() if key != "_pstats"}
+    return None
+
+
+def get_request_pstats(profile_id: str) -> Optional[bytes]:
+    # Same bytes as Profile.dump_stats(), so `python -m pstats` or snakeviz can open it
+    profile = get_request_profile(profile_id, raw=True)
+    return profile["_pstats"] if profile else None
+
+
+def clear_request_profiles() -> int:
+    with _profiles_lock:
+        count = len(_profiles)
+        _profiles.clear()
+    return count
+
+
+class ProfilingMiddleware:
+    # Plain ASGI middleware. A request is profiled when an admin sends "X-Profile: 1"
+    # with a valid X-Admin-Token, or when it is picked by PROFILE_SAMPLE_RATE. Otherwise
+    # the cost is one header scan and one random() call.
+    #
+    # cProfile records the event-loop thread: time awaiting I/O is not attributed, and
+    # other requests running on the loop at the same time also show up in the profile.
+    # Work handed to the CPU executors appears as the awaiting frame, not its internals.
+
+    def __init__(self, app, admin_token: str = "", sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.admin_token = admin_token.encode("utf-8") if admin_token else b""
+        self.sample_rate = sample_rate
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.admin_token:
+            requested = token = None
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    requested = value
+                elif name == b"x-admin-token":
+                    token = value
+            if requested in (b"1", b"true") and token and hmac.compare_digest(token, self.admin_token):
+                return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"prof_{uuid.uuid4().hex[:12]}"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trigger == "header":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode("ascii"))]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+        finally:
+            _active.release()
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        if trigger == "sample" and duration_ms < PROFILE_MIN_DURATION_MS:
+            return
+
+        stats = pstats.Stats(profiler)
+        route = scope.get("route")
+        _store({
+            "id": profile_id,
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "trigger": trigger,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "total_calls": stats.total_calls,
+            "idle_ms": round(sum(row[2] for frame, row in stats.stats.items() if _is_idle(frame)) * 1000, 3),
+            "top_frames": _top_frames(stats, PROFILE_TOP_FRAMES),
+            "_pstats": marshal.dumps(stats.stats),
+        })
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone, timedelta
+from typing import Any, Optional
+from db import get_db
+from services.metrics import record_cache_lookup
+
+# Defaults apply to every namespace unless the caller passes its own limits.
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+# 0 disables time-based expiry; entries are then only evicted by the size bound.
+RESULT_CACHE_TTL_HOURS = float(os.getenv("RESULT_CACHE_TTL_HOURS", "0"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_file(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(namespace: str, content_hash: str, provider: str, model: str, prompt_version: str) -> str:
+    raw = "\x1f".join([namespace, content_hash, provider, model, prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached(
+        namespace: str,
+        content_hash: str,
+        provider: str,
+        model: str,
+        prompt_version: str,
+        ttl_hours: Optional[float] = None) -> Optional[Any]:
+    ttl_hours = RESULT_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    cache_key = make_cache_key(namespace, content_hash, provider, model, prompt_version)
+    now = datetime.now(timezone.utc)
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT result_json, created_at FROM result_cache WHERE cache_key = ?", (cache_key,))
+        row = cursor.fetchone()
+        if not row:
+            record_cache_lookup(namespace, False)
+            return None
+
+        if ttl_hours > 0 and datetime.fromisoformat(row["created_at"]) < now - timedelta(hours=ttl_hours):
+            cursor.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+            record_cache_lookup(namespace, False)
+            return None
+
+        record_cache_lookup(namespace, True)
+
+        cursor.execute(
+            "UPDATE result_cache SET last_used_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+            (now.isoformat(), cache_key)
+        )
+
+    return json.loads(row["result_json"])
+
+
+def put_cached(
+        namespace: str,
+        content_hash: str,
+        provider: str,
+        model: str,
+        prompt_version: str,
+        result: Any,
+        max_entries: Optional[int] = None,
+        ttl_hours: Optional[float] = None) -> str:
+    cache_key = make_cache_key(namespace, content_hash, provider, model, prompt_version)
+    now = datetime.now(timezone.utc).isoformat()
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO result_cache
+                (cache_key, namespace, content_hash, provider, model, prompt_version, result_json, created_at, last_used_at, hit_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """, (cache_key, namespace, content_hash, provider, model, prompt_version, json.dumps(result), now, now))
+        _evict(cursor, namespace, max_entries, ttl_hours)
+
+    return cache_key
+
+
+def evict(namespace: str, max_entries: Optional[int] = None, ttl_hours: Optional[float] = None) -> int:
+    with get_db() as conn:
+        return _evict(conn.cursor(), namespace, max_entries, ttl_hours)
+
+
+def clear(namespace: Optional[str] = None) -> int:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if namespace:
+            cursor.execute("DELETE FROM result_cache WHERE namespace = ?", (namespace,))
+        else:
+            cursor.execute("DELETE FROM result_cache")
+        return cursor.rowcount
+
+
+def _evict(cursor, namespace: str, max_entries: Optional[int], ttl_hours: Optional[float]) -> int:
+    max_entries = RESULT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    ttl_hours = RESULT_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    removed = 0
+
+    if ttl_hours > 0:
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=ttl_hours)).isoformat()
+        cursor.execute("DELETE FROM result_cache WHERE namespace = ? AND created_at < ?", (namespace, cutoff))
+        removed += cursor.rowcount
+
+    # Least-recently-used entries go first once the namespace is over its bound.
+    cursor.execute("SELECT COUNT(*) FROM result_cache WHERE namespace = ?", (namespace,))
+    overflow = cursor.fetchone()[0] - max_entries
+    if overflow > 0:
+        cursor.execute("""
+            DELETE FROM result_cache WHERE cache_key IN (
+                SELECT cache_key FROM result_cache WHERE namespace = ?
+                ORDER BY last_used_at ASC LIMIT ?
+            )
+        """, (namespace, overflow))
+        removed += cursor.rowcount
+
+    return removed
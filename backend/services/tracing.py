@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import queue
+import random
+import inspect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+# In-process spans following the OpenTelemetry data model (trace/span ids, parent,
+# kind, unix-nano timestamps, attributes, status, events). Finished spans go to a ring
+# buffer served from /admin/traces and, when TRACE_EXPORT_PATH is set, are appended to
+# that file as JSON lines by a background thread. No collector is needed.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "arogya-backend")
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_finished: Deque["Span"] = deque(maxlen=TRACE_BUFFER_SIZE)
+_finished_lock = threading.Lock()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_span_id", "start_time_unix_nano",
+                 "end_time_unix_nano", "attributes", "status_code", "status_message", "events")
+
+    def __init__(self, name: str, kind: str = "INTERNAL", trace_id: Optional[str] = None,
+                 parent_span_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id or _new_id(128)
+        self.span_id = _new_id(64)
+        self.parent_span_id = parent_span_id
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status_code = "UNSET"
+        self.status_message = ""
+        self.events: List[Dict[str, Any]] = []
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error: BaseException):
+        self.status_code = "ERROR"
+        self.status_message = str(error)[:200]
+        self.add_event("exception", **{"exception.type": type(error).__name__, "exception.message": str(error)[:500]})
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_unix_nano is None:
+            return None
+        return round((self.end_time_unix_nano - self.start_time_unix_nano) / 1e6, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": {"code": self.status_code, "message": self.status_message},
+            "events": self.events,
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class _JsonLinesExporter:
+    # File writes happen on a daemon thread so finishing a span never blocks on disk.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[Span]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        self._queue.put(span)
+
+    def _write_loop(self):
+        while True:
+            spans = [self._queue.get()]
+            while True:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans))
+            except OSError as e:
+                print(f"Trace export to {self.path} failed: {e}")
+
+
+_exporter = _JsonLinesExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+
+
+def _finish(span: Span):
+    span.end_time_unix_nano = time.time_ns()
+    with _finished_lock:
+        _finished.append(span)
+    if _exporter is not None:
+        _exporter.export(span)
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, kind: str = "INTERNAL", child_only: bool = False, **attributes):
+    # Child of the current span, or the root of a new trace when there is none.
+    # child_only skips recording outside a trace, for calls so frequent on their own
+    # (e.g. background pollers) that they would push real traces out of the buffer.
+    parent = _current.get()
+    if not TRACING_ENABLED or (child_only and parent is None):
+        yield _NOOP
+        return
+    current = Span(name, kind, parent.trace_id if parent else None, parent.span_id if parent else None, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current)
+
+
+def traced(name: Optional[str] = None, kind: str = "INTERNAL", **attributes):
+    # Decorator form of span() for sync or async functions.
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+def get_trace(trace_id: str) -> List[Dict[str, Any]]:
+    with _finished_lock:
+        spans = [s for s in _finished if s.trace_id == trace_id]
+    return [s.to_dict() for s in sorted(spans, key=lambda s: s.start_time_unix_nano)]
+
+
+def recent_traces(limit: int = 50) -> List[Dict[str, Any]]:
+    # Root spans (usually one per HTTP request), newest first
+    with _finished_lock:
+        roots = [s for s in reversed(_finished) if s.parent_span_id is None or s.kind == "SERVER"][:limit]
+    return [
+        {
+            "trace_id": s.trace_id,
+            "name": s.name,
+            "start_time_unix_nano": s.start_time_unix_nano,
+            "duration_ms": s.duration_ms,
+            "status": s.status_code,
+            "attributes": s.attributes,
+        }
+        for s in roots
+    ]
+
+
+def _parse_traceparent(value: bytes):
+    # W3C traceparent: version-trace_id-parent_id-flags
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        if int(parts[1], 16) == 0 or int(parts[2], 16) == 0:
+            return None, None
+    except ValueError:
+        return None, None
+    return parts[1].lower(), parts[2].lower()
+
+
+class TracingMiddleware:
+    # Plain ASGI middleware opening the SERVER span for each request. An incoming
+    # traceparent header continues the caller's trace; the trace id is returned in
+    # X-Trace-Id and traceparent response headers.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                trace_id, parent_id = _parse_traceparent(value)
+                break
+
+        with span(f"{scope['method']} {scope['path']}", "SERVER", **{
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        }) as server_span:
+            if trace_id:
+                server_span.trace_id = trace_id
+                server_span.parent_span_id = parent_id
+            trace_headers = [
+                (b"x-trace-id", server_span.trace_id.encode("ascii")),
+                (b"traceparent", f"00-{server_span.trace_id}-{server_span.span_id}-01".encode("ascii")),
+            ]
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        server_span.status_code = "ERROR"
+                    message["headers"] = list(message.get("headers", [])) + trace_headers
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    server_span.name = f"{scope['method']} {route}"
+                    server_span.set_attribute("http.route", route)
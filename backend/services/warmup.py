@@ -0,0 +1,46 @@
+import os
+import time
+import threading
+import importlib
+from typing import Dict, List
+
+from services.gemini import GEMINI_API_KEY, GEMINI_PROVIDER
+
+# The heavy SDKs are imported lazily so the app starts serving quickly; this imports
+# them on a background thread right after startup so the first request that needs
+# one does not pay for it either. Set IMPORT_WARMUP=false to import strictly on demand.
+IMPORT_WARMUP = os.getenv("IMPORT_WARMUP", "true").lower() == "true"
+
+import_timings: Dict[str, float] = {}
+_started = False
+_lock = threading.Lock()
+
+
+def warmup_modules() -> List[str]:
+    modules = ["bcrypt", "httpx", "PyPDF2", "PIL.Image"]
+    if GEMINI_API_KEY and GEMINI_PROVIDER == "google":
+        modules.append("google.generativeai")
+    return modules
+
+
+def _import_all(modules: List[str]):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Warm-up import of {name} failed: {e}")
+            continue
+        import_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"Warm-up imports done in {sum(import_timings.values()):.0f} ms: "
+          + ", ".join(f"{name} {ms:.0f} ms" for name, ms in import_timings.items()))
+
+
+def start_import_warmup():
+    # Safe to call repeatedly; only the first call starts the thread.
+    global _started
+    with _lock:
+        if _started or not IMPORT_WARMUP:
+            return
+        _started = True
+    threading.Thread(target=_import_all, args=(warmup_modules(),), name="import-warmup", daemon=True).start()
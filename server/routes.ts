@@ -80,6 +80,7 @@ export async function registerRoutes(
   app.use("/api", proxyToFastAPI);
   app.use("/patients", proxyToFastAPI);
   app.use("/safety", proxyToFastAPI);
+  app.use("/drugs", proxyToFastAPI);
   app.use("/files", proxyToFastAPI);
   app.get("/health", proxyToFastAPI);
 